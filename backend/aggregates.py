@@ -0,0 +1,119 @@
+import copy
+import numpy as np
+import pandas as pd
+
+
+class AggregateCube:
+    """
+    Units sold, remaining stock and price totals by (year, month, category, product), with
+    (year, month) and (year, month, category) rollups. Built once per load and extended on
+    ingest, so sales, stock and trend queries are dict lookups instead of frame scans.
+
+    Every cell is [units, stock, price_sum, rows]; average price is price_sum / rows.
+    """
+
+    def __init__(self, years, month_nums, categories, names, units, stock, prices):
+        self.cells = {}
+        self.period = {}
+        self.period_category = {}
+        # (year, month) -> {product: remaining stock}
+        self.period_products = {}
+
+        if len(years) == 0:
+            return
+
+        keys, values = self._columns(years, month_nums, categories, names, units, stock, prices)
+        self.cells = self._totals(keys, values)
+        self.period = self._totals(keys[:2], values)
+        self.period_category = self._totals(keys[:3], values)
+        for (y, m, _, name), cell in self.cells.items():
+            self.period_products.setdefault((y, m), {})[name] = int(cell[1])
+
+    def extended(self, years, month_nums, categories, names, units, stock, prices):
+        # Copy of this cube with new rows added; only the touched cells and rollups change
+        cube = copy.copy(self)
+        cube.cells = dict(self.cells)
+        cube.period = dict(self.period)
+        cube.period_category = dict(self.period_category)
+        cube.period_products = dict(self.period_products)
+
+        keys, values = self._columns(years, month_nums, categories, names, units, stock, prices)
+        touched_periods = set()
+        for key, cell in self._totals(keys, values).items():
+            y, m, cat, name = key
+            cube.cells[key] = self._add(cube.cells.get(key), cell)
+            cube.period[(y, m)] = self._add(cube.period.get((y, m)), cell)
+            cube.period_category[(y, m, cat)] = self._add(cube.period_category.get((y, m, cat)), cell)
+            if (y, m) not in touched_periods:
+                cube.period_products[(y, m)] = dict(cube.period_products.get((y, m), {}))
+                touched_periods.add((y, m))
+            cube.period_products[(y, m)][name] = int(cube.period_products[(y, m)].get(name, 0) + cell[1])
+        return cube
+
+    def period_totals(self, year, month, category=None):
+        if category is None:
+            return self.period.get((int(year), int(month)))
+        return self.period_category.get((int(year), int(month), category))
+
+    def units_sold(self, year, month, category=None):
+        cell = self.period_totals(year, month, category)
+        return int(cell[0]) if cell else 0
+
+    def series(self, start_year, end_year, category=None, product=None):
+        # One point per (year, month) in the range; product lookups need its category
+        points = []
+        for year in range(int(start_year), int(end_year) + 1):
+            for month in range(1, 13):
+                if product is not None:
+                    cell = self.cells.get((year, month, category, product))
+                else:
+                    cell = self.period_totals(year, month, category)
+                units, stock, price_sum, rows = cell if cell else (0, 0, 0.0, 0)
+                points.append({
+                    "year": year,
+                    "month": month,
+                    "units_sold": int(units),
+                    "remaining_stock": int(stock),
+                    "avg_price": round(price_sum / rows, 2) if rows else None,
+                })
+        return points
+
+    @staticmethod
+    def _columns(years, month_nums, categories, names, units, stock, prices):
+        # Key columns as (integer codes, decoder) pairs, values as an (n, 4) float matrix
+        years = np.asarray(years, dtype=np.int64)
+        year_min = int(years.min())
+        cat_codes, cat_uniques = pd.factorize(np.asarray(categories))
+        name_codes, name_uniques = pd.factorize(np.asarray(names))
+        keys = [
+            (years - year_min, lambda codes: (codes + year_min).tolist()),
+            (np.asarray(month_nums, dtype=np.int64), lambda codes: codes.tolist()),
+            (cat_codes, lambda codes: cat_uniques[codes].tolist()),
+            (name_codes, lambda codes: name_uniques[codes].tolist()),
+        ]
+        values = np.column_stack([
+            np.asarray(units, dtype=np.float64),
+            np.asarray(stock, dtype=np.float64),
+            np.asarray(prices, dtype=np.float64),
+            np.ones(len(years)),
+        ])
+        return keys, values
+
+    @staticmethod
+    def _totals(keys, values):
+        # Group rows on the combined key codes and sum each value column
+        composite = np.zeros(len(values), dtype=np.int64)
+        for codes, _ in keys:
+            composite = composite * (int(codes.max()) + 1) + codes
+        uniques, first, inverse = np.unique(composite, return_index=True, return_inverse=True)
+        sums = np.column_stack([
+            np.bincount(inverse, weights=values[:, j], minlength=len(uniques)) for j in range(values.shape[1])
+        ])
+        key_columns = [decode(codes[first]) for codes, decode in keys]
+        return dict(zip(zip(*key_columns), sums.tolist()))
+
+    @staticmethod
+    def _add(cell, values):
+        if cell is None:
+            return list(values)
+        return [a + b for a, b in zip(cell, values)]
@@ -0,0 +1,247 @@
+"""
+Offline benchmarks for the backend hot paths.
+
+Runs against synthetic datasets scaled up from the shipped workbook, times the
+DataLoader, DemandPredictor, GeneticOptimizer and the FastAPI endpoints (through an
+in-process TestClient), writes the results to JSON and optionally compares them with a
+stored baseline:
+
+    python benchmark.py                               # 1x and 10x, writes benchmark_results.json
+    python benchmark.py --scales 1x 10x 100x
+    python benchmark.py --baseline benchmark_baseline.json --threshold 0.5
+    python benchmark.py --save-baseline benchmark_baseline.json
+
+Exits with status 1 if any benchmark's best time is slower than baseline * (1 + threshold) and
+the difference is larger than the noise allowance (see compare()).
+
+Only save a new baseline in a commit of its own, on the machine the gate runs on; regenerating it
+alongside a feature change hides whatever that change did to the timings.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+
+from data_cache import ColumnarCache, compact_frame
+from data_loader import DEFAULT_DATA_PATH, DataLoader, STOCK_COL, SOLD_COL
+import data_loader as data_loader_module
+from ml_engine import DemandPredictor, GeneticOptimizer
+from model_registry import ModelRegistry
+from sharding import ShardCoordinator
+
+# name -> (product multiplier, year multiplier); row count grows by the product of both
+SCALES = {
+    "1x": (1, 1),
+    "10x": (5, 2),
+    "100x": (25, 4),
+}
+
+# Differences below this many seconds are treated as timer noise when comparing to a baseline
+NOISE_FLOOR_S = 0.002
+# ... and so are differences below this many times the baseline's own spread (median - min)
+NOISE_SPREADS = 3
+# Fast calls are sampled beyond --rounds until they've run this long in total, for a stabler best time
+MIN_SAMPLE_S = 0.2
+MAX_ROUNDS = 50
+
+
+def make_synthetic_frame(base, product_scale=1, year_scale=1, seed=0):
+    # Copies of the catalog under new product names, and extra history shifted into earlier years
+    rng = np.random.default_rng(seed)
+    base = base.copy()
+    for col in base.columns:
+        if isinstance(base[col].dtype, pd.CategoricalDtype):
+            base[col] = base[col].astype(str)
+    years = sorted(base['year'].unique())
+    span = int(years[-1] - years[0] + 1)
+
+    frames = []
+    for p in range(product_scale):
+        for y in range(year_scale):
+            frame = base.copy()
+            if p:
+                frame['product_name'] = frame['product_name'] + f" #{p}"
+                frame['product_id'] = frame['product_id'] + f"-{p}"
+            frame['year'] = frame['year'] - y * span
+            jitter = rng.uniform(0.8, 1.2, len(frame))
+            frame[SOLD_COL] = (frame[SOLD_COL] * jitter).round().astype(np.int64)
+            frame[STOCK_COL] = (frame[STOCK_COL] * jitter).round().astype(np.int64)
+            frames.append(frame)
+    # Same representation the loader gets from the columnar cache
+    return compact_frame(pd.concat(frames, ignore_index=True))
+
+
+def time_call(fn, rounds=5, warmup=1, setup=None):
+    for _ in range(warmup):
+        if setup:
+            setup()
+        fn()
+    samples = []
+    while len(samples) < rounds or (sum(samples) < MIN_SAMPLE_S and len(samples) < MAX_ROUNDS):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return {
+        "median_s": statistics.median(samples),
+        "min_s": min(samples),
+        "rounds": len(samples),
+    }
+
+
+def bench_cold_load(results, workbook):
+    # Workbook parse vs. columnar cache load, on the real file
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = ColumnarCache(workbook, os.path.join(tmp, "cache"))
+        results["cold/read_excel"] = time_call(lambda: DataLoader._read_workbook(workbook), rounds=3, warmup=0)
+        cache.load_or_build(DataLoader._read_workbook)
+        results["cold/cache_load"] = time_call(cache.load, rounds=5)
+
+
+def bench_scale(results, name, base, rounds):
+    product_scale, year_scale = SCALES[name]
+    frame = make_synthetic_frame(base, product_scale, year_scale)
+    prefix = f"{name}/"
+
+    results[prefix + "loader.build"] = time_call(lambda: DataLoader(df=frame), rounds=rounds)
+    loader = DataLoader(df=frame)
+    products = sorted(loader.index.product_rows)
+    product = products[len(products) // 2]
+    year = int(frame['year'].max())
+    category = loader.get_categories()[0]
+
+    accessors = {
+        "get_sales_data": lambda: loader.get_sales_data(year, 1),
+        "get_storage_data": lambda: loader.get_storage_data(year, 1),
+        "get_product_stock": lambda: loader.get_product_stock(product, year, 1),
+        "get_product_details": lambda: loader.get_product_details(product),
+        "check_supplier_availability": lambda: loader.check_supplier_availability(product, 10),
+        "get_categories": loader.get_categories,
+        "get_products_by_category": lambda: loader.get_products_by_category(category),
+        "get_monthly_trends": lambda: loader.get_monthly_trends(year),
+        "get_trends": lambda: loader.get_trends(int(frame['year'].min()), year, loader.get_categories()),
+        "get_unique_products": loader.get_unique_products,
+    }
+    for accessor, fn in accessors.items():
+        results[prefix + "loader." + accessor] = time_call(fn, rounds=rounds)
+
+    predictor = DemandPredictor(loader)
+    results[prefix + "predictor.train_model"] = time_call(predictor.train_model, rounds=max(1, rounds // 2), warmup=0)
+    results[prefix + "predictor.predict_single_item"] = time_call(
+        lambda: predictor.predict_single_item(product, year, 1, 2), rounds=rounds)
+    results[prefix + "predictor.predict_batch"] = time_call(
+        lambda: predictor.predict_batch(products, year, 1, 2), rounds=rounds)
+
+    demand = predictor.predict_single_item(product, year, 1, 2)
+    stock = loader.get_product_stock(product, year, 1)
+    results[prefix + "optimizer.optimize_supply_chain"] = time_call(
+        lambda: GeneticOptimizer(seed=0).optimize_supply_chain(product, demand, stock), rounds=rounds)
+
+    bench_endpoints(results, prefix, loader, product, year, category, rounds)
+
+
+def bench_endpoints(results, prefix, loader, product, year, category, rounds):
+    from fastapi.testclient import TestClient
+
+    # Point the app at the synthetic dataset; models go to a throwaway registry
+    data_loader_module._shared_loader = loader
+    import main
+    main.data_loader = loader
+    with tempfile.TemporaryDirectory() as tmp:
+        main.predictor = DemandPredictor(loader, registry=ModelRegistry(tmp))
+        main.predictor.ensure_model()
+        # The coordinator holds its own references; without this /analysis/demand would still
+        # analyze (and train a model for) the import-time dataset
+        main.coordinator = ShardCoordinator(
+            loader, main.predictor, workers=main.analysis, local=main.inference,
+            min_products=main.coordinator.min_products)
+        client = TestClient(main.app)
+
+        requests = {
+            "analysis_demand": ("post", "/analysis/demand", {"year": year, "month": 1, "holidays": 2}),
+            "supply_reorder": ("post", "/supply/reorder", {
+                "year": year, "month": 1, "category": category, "item": product, "product": product, "holidays": 2}),
+            "supply_optimize": ("post", "/supply/optimize", {
+                "product": product, "year": year, "month": 1, "holidays": 2, "seed": 0}),
+            "data_categories": ("get", "/data/categories", None),
+            "data_products": ("get", "/data/products", None),
+        }
+        for name, (method, url, body) in requests.items():
+            call = (lambda u=url, b=body: client.post(u, json=b)) if method == "post" else (lambda u=url: client.get(u))
+            # Uncached cost: clear the response cache before every round
+            results[prefix + "api." + name] = time_call(call, rounds=rounds, setup=main.response_cache.invalidate)
+            results[prefix + "api." + name + ".cached"] = time_call(call, rounds=rounds)
+
+
+def compare(results, baseline, threshold):
+    # Compares best-of-rounds times, which are far less sensitive to machine noise than medians.
+    # A slowdown also has to exceed the noise allowance: NOISE_FLOOR_S, or NOISE_SPREADS times the
+    # baseline's median - min for benchmarks that were already jittery when it was recorded.
+    regressions = []
+    for name, base in baseline.get("results", {}).items():
+        current = results.get(name)
+        if current is None:
+            continue
+        limit = base["min_s"] * (1 + threshold)
+        noise = max(NOISE_FLOOR_S, NOISE_SPREADS * (base["median_s"] - base["min_s"]))
+        if current["min_s"] > limit and current["min_s"] - base["min_s"] > noise:
+            regressions.append((name, base["min_s"], current["min_s"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend hot paths")
+    parser.add_argument("--scales", nargs="+", default=["1x", "10x"], choices=sorted(SCALES))
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Workbook the synthetic data is derived from")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--threshold", type=float, default=0.5, help="Allowed slowdown vs. baseline (0.5 = 50%%)")
+    parser.add_argument("--save-baseline", help="Also write the results to this path as the new baseline")
+    args = parser.parse_args()
+
+    base = DataLoader._read_workbook(args.data)
+    results = {}
+    bench_cold_load(results, args.data)
+    for name in args.scales:
+        print(f"Running {name} benchmarks...")
+        bench_scale(results, name, base, args.rounds)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "created_at": time.time(),
+            "scales": args.scales,
+        },
+        "results": results,
+    }
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    width = max(len(name) for name in results)
+    for name, r in results.items():
+        print(f"{name:<{width}}  {r['median_s'] * 1000:10.3f} ms")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms")
+        if regressions:
+            sys.exit(1)
+        print("No regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
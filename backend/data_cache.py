@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+import pandas as pd
+
+# Bump when the on-disk layout changes so old caches are rebuilt
+CACHE_FORMAT_VERSION = 2
+
+# Narrow numeric dtypes for the known workbook columns. Counts stay integral (int32) rather
+# than float32 so totals and JSON output are exact; other numeric columns fall back to
+# float32 / int32 when their values fit.
+COMPACT_DTYPES = {
+    'year': np.int16,
+    'product_price': np.float32,
+    'purchase_price': np.float32,
+    'No.of holidays in that month': np.int8,
+    'total_units_sold_in_month': np.int32,
+    'Initial_stock_for_month': np.int32,
+    'Total product remaining in stock for that month': np.int32,
+}
+
+
+def compact_frame(df):
+    # Text columns become categoricals, numerics are narrowed (see COMPACT_DTYPES).
+    # Columns that are already compact are passed through without a copy.
+    columns = {}
+    for col in df.columns:
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            columns[col] = series
+        elif not pd.api.types.is_numeric_dtype(series.dtype) or pd.api.types.is_bool_dtype(series.dtype):
+            columns[col] = series.astype(str).astype('category')
+        else:
+            target = np.dtype(COMPACT_DTYPES.get(col) or (np.float32 if series.dtype.kind == 'f' else np.int32))
+            columns[col] = series.astype(target) if series.dtype != target and _fits(series, target) else series
+    return pd.DataFrame(columns, copy=False)
+
+
+def _fits(series, dtype):
+    if dtype.kind == 'f' or series.empty:
+        return True
+    if series.dtype.kind == 'f' and not np.array_equal(series.to_numpy(), np.round(series.to_numpy())):
+        return False
+    info = np.iinfo(dtype)
+    return info.min <= series.min() and series.max() <= info.max
+
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def frame_digest(df):
+    # Content hash for frames that don't come from a file (synthetic or ingested data)
+    row_hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    h = hashlib.sha256(row_hashes.tobytes())
+    h.update(json.dumps([str(c) for c in df.columns]).encode())
+    return h.hexdigest()
+
+
+class ColumnarCache:
+    """
+    On-disk columnar copy of the workbook in its compact form (see compact_frame): one
+    .npy file per column, text columns dictionary-encoded as (codes, categories). Numeric
+    columns are memory-mapped on load, so warm starts skip openpyxl entirely.
+    """
+
+    def __init__(self, source_path, cache_dir=None):
+        self.source_path = source_path
+        if cache_dir is None:
+            base_dir = os.path.dirname(os.path.abspath(source_path))
+            stem = os.path.splitext(os.path.basename(source_path))[0]
+            cache_dir = os.path.join(base_dir, '.cache', stem)
+        self.cache_dir = cache_dir
+        self.meta_path = os.path.join(cache_dir, 'meta.json')
+
+    def load_or_build(self, read_source):
+        # Returns (df, sha256 of the source file)
+        cached = self.load()
+        if cached is not None:
+            return cached
+
+        df = compact_frame(read_source(self.source_path))
+        digest = file_digest(self.source_path)
+        try:
+            self.save(df, digest)
+        except OSError as e:
+            print(f"Could not write data cache: {e}")
+        return df, digest
+
+    def load(self):
+        meta = self._read_meta()
+        if meta is None:
+            return None
+
+        st = os.stat(self.source_path)
+        if meta['mtime_ns'] != st.st_mtime_ns or meta['size'] != st.st_size:
+            # The file was touched or replaced; only rebuild if the content actually changed
+            digest = file_digest(self.source_path)
+            if digest != meta['sha256']:
+                return None
+            meta['mtime_ns'], meta['size'] = st.st_mtime_ns, st.st_size
+            self._write_meta(self.cache_dir, meta)
+
+        try:
+            return self._read_frame(meta), meta['sha256']
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Data cache unreadable, rebuilding: {e}")
+            return None
+
+    def save(self, df, digest):
+        st = os.stat(self.source_path)
+        tmp_dir = f"{self.cache_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        columns = []
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            if pd.api.types.is_numeric_dtype(series.dtype):
+                np.save(os.path.join(tmp_dir, f"{i}.npy"), series.to_numpy())
+                columns.append({"name": col, "kind": "numeric"})
+            else:
+                codes, uniques = pd.factorize(series.astype(str), sort=True)
+                np.save(os.path.join(tmp_dir, f"{i}.codes.npy"), codes.astype(_code_dtype(len(uniques))))
+                np.save(os.path.join(tmp_dir, f"{i}.categories.npy"), np.asarray(uniques, dtype=str))
+                columns.append({"name": col, "kind": "text"})
+
+        self._write_meta(tmp_dir, {
+            "format": CACHE_FORMAT_VERSION,
+            "source": os.path.abspath(self.source_path),
+            "mtime_ns": st.st_mtime_ns,
+            "size": st.st_size,
+            "sha256": digest,
+            "rows": len(df),
+            "columns": columns,
+        })
+
+        # Publish the finished directory in one step so other workers never read a partial cache
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        os.replace(tmp_dir, self.cache_dir)
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if meta.get('format') != CACHE_FORMAT_VERSION:
+            return None
+        return meta
+
+    def _write_meta(self, directory, meta):
+        with open(os.path.join(directory, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+    def _read_frame(self, meta):
+        data = {}
+        for i, col in enumerate(meta['columns']):
+            name = col['name']
+            if col['kind'] == 'numeric':
+                data[name] = np.load(os.path.join(self.cache_dir, f"{i}.npy"), mmap_mode='r')
+                continue
+
+            codes = np.load(os.path.join(self.cache_dir, f"{i}.codes.npy"), mmap_mode='r')
+            categories = np.load(os.path.join(self.cache_dir, f"{i}.categories.npy"))
+            # Codes were written by save(), so skip pandas' range check
+            data[name] = pd.Categorical.from_codes(
+                codes, dtype=pd.CategoricalDtype(categories.tolist()), validate=False)
+        return pd.DataFrame(data, copy=False)
+
+
+def _code_dtype(n_categories):
+    # Smallest signed integer type that holds the category codes (pandas needs room for -1)
+    for dtype in (np.int8, np.int16, np.int32):
+        if n_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
@@ -1,31 +1,396 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
 import pandas as pd
 import numpy as np
+from pandas.api.types import union_categoricals
+from aggregates import AggregateCube
+from data_cache import ColumnarCache, compact_frame, file_digest, frame_digest
+from metrics import count, span, timed
+
+DEFAULT_DATA_PATH = "../full_dataset_monthly_storage_fixed.xlsx"
+
+MONTH_MAP = {
+    1: "January", 2: "February", 3: "March", 4: "April",
+    5: "May", 6: "June", 7: "July", 8: "August",
+    9: "September", 10: "October", 11: "November", 12: "December"
+}
+MONTH_NUMBERS = {name: num for num, name in MONTH_MAP.items()}
+
+SOLD_COL = 'total_units_sold_in_month'
+STOCK_COL = 'Total product remaining in stock for that month'
+HOLIDAYS_COL = 'No.of holidays in that month'
+
+# Optional column for multi-store data; without it the whole dataset is one store
+STORE_COL = 'store_id'
+DEFAULT_STORE = 'default'
+
+# Columns every ingested row must provide (the index and the model depend on them)
+REQUIRED_COLUMNS = ['product_name', 'product_category', 'product_price', 'month', 'year', 'season',
+                    HOLIDAYS_COL, SOLD_COL, STOCK_COL]
+
+
+class DatasetIndex:
+    """
+    Lookup tables built once per load so accessors don't rescan the frame:
+    product -> rows ordered by (year, month), (year, month) -> rows,
+    (year, month, product) -> rows, plus per-product latest stock and mean price,
+    and the monthly AggregateCube.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.product_rows = {}
+        self.period_rows = {}
+        self.period_product_rows = {}
+        self.latest_stock = {}
+        self.mean_price = {}
+        # First row of each product in file order (the predictor builds its features from it)
+        self.first_row = {}
+        self.total_stock = {}
+        self.categories = []
+        self.products_by_category = {}
+        self.cube = AggregateCube([], [], [], [], [], [], [])
+
+        if df.empty:
+            return
+
+        n = len(df)
+        names = df['product_name'].astype(str).to_numpy()
+        self.names = names
+        years = df['year'].to_numpy().astype(np.int64)
+        month_nums = month_numbers(df['month'])
+        self.sold = df[SOLD_COL].to_numpy()
+        self.stock = df[STOCK_COL].to_numpy()
+        self.month_nums = month_nums
+
+        # Product codes in order of first appearance
+        codes, uniques = pd.factorize(names)
+        # Stable sort, so rows within the same (year, month) keep file order
+        order = np.lexsort((month_nums, years, codes))
+        starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+        ends = np.r_[starts[1:], n]
+        prices = price_values(df)
+        for start, end in zip(starts, ends):
+            rows = order[start:end]
+            name = uniques[codes[rows[0]]]
+            self.product_rows[name] = rows
+            self.latest_stock[name] = latest_period_stock(rows, years, month_nums, self.stock)
+            self.mean_price[name] = float(prices[rows].mean(dtype=np.float64))
+            self.first_row[name] = int(rows.min())
+
+        positions = pd.Series(np.arange(n))
+        self.period_rows = {
+            (int(y), int(m)): rows
+            for (y, m), rows in positions.groupby([years, month_nums]).indices.items()
+        }
+        self.period_product_rows = {
+            (int(y), int(m), name): rows
+            for (y, m, name), rows in positions.groupby([years, month_nums, names]).indices.items()
+        }
+
+        self.total_stock = df.groupby('product_name', observed=True)[STOCK_COL].sum().to_dict()
+
+        categories = df['product_category'].astype(str).to_numpy()
+        self.categories = pd.unique(categories).tolist()
+        cat_product = pd.DataFrame({'cat': categories, 'name': names}).drop_duplicates()
+        for cat, group in cat_product.groupby('cat', sort=False):
+            self.products_by_category[cat] = group['name'].tolist()
+
+        self.cube = AggregateCube(years, month_nums, categories, names, self.sold, self.stock, prices)
+
+    def rows_for_period(self, year, month):
+        return self.period_rows.get((int(year), int(month)), np.empty(0, dtype=np.intp))
+
+    def extended(self, df, start):
+        # Index for `df`, whose rows before `start` are the ones this index already covers.
+        # Only products/periods present in the new rows are touched; the rest is shared.
+        if self.df.empty:
+            return DatasetIndex(df)
+
+        index = copy.copy(self)
+        index.df = df
+        delta = df.iloc[start:]
+        n_new = len(delta)
+        positions = np.arange(start, start + n_new)
+        names = delta['product_name'].astype(str).to_numpy()
+        years = delta['year'].to_numpy().astype(np.int64)
+        month_nums = month_numbers(delta['month'])
+        categories = delta['product_category'].astype(str).to_numpy()
+        prices = price_values(df)
+
+        index.names = np.concatenate([self.names, names])
+        index.month_nums = np.concatenate([self.month_nums, month_nums])
+        index.sold = df[SOLD_COL].to_numpy()
+        index.stock = df[STOCK_COL].to_numpy()
+        all_years = df['year'].to_numpy()
+
+        index.product_rows = dict(self.product_rows)
+        index.latest_stock = dict(self.latest_stock)
+        index.mean_price = dict(self.mean_price)
+        index.first_row = dict(self.first_row)
+        index.total_stock = dict(self.total_stock)
+        index.categories = list(self.categories)
+        index.products_by_category = {cat: list(prods) for cat, prods in self.products_by_category.items()}
+
+        for name, rows in pd.Series(positions).groupby(names, sort=False).indices.items():
+            new_rows = positions[rows]
+            old_rows = self.product_rows.get(name, np.empty(0, dtype=np.int64))
+            merged = np.concatenate([old_rows, new_rows])
+            merged = merged[np.lexsort((index.month_nums[merged], all_years[merged]))]
+            index.product_rows[name] = merged
+            index.latest_stock[name] = latest_period_stock(merged, all_years, index.month_nums, index.stock)
+            old_total = self.mean_price.get(name, 0.0) * len(old_rows)
+            index.mean_price[name] = float((old_total + prices[new_rows].sum(dtype=np.float64)) / len(merged))
+            index.first_row.setdefault(name, int(new_rows.min()))
+            index.total_stock[name] = int(self.total_stock.get(name, 0) + index.stock[new_rows].sum())
+
+        index.period_rows = dict(self.period_rows)
+        for (y, m), rows in pd.Series(positions).groupby([years, month_nums]).indices.items():
+            key = (int(y), int(m))
+            index.period_rows[key] = np.concatenate([self.period_rows.get(key, np.empty(0, dtype=np.int64)), positions[rows]])
+
+        index.period_product_rows = dict(self.period_product_rows)
+        for (y, m, name), rows in pd.Series(positions).groupby([years, month_nums, names]).indices.items():
+            key = (int(y), int(m), name)
+            index.period_product_rows[key] = np.concatenate(
+                [self.period_product_rows.get(key, np.empty(0, dtype=np.int64)), positions[rows]])
+
+        for cat, name in dict.fromkeys(zip(categories, names)):
+            if cat not in index.products_by_category:
+                index.categories.append(cat)
+                index.products_by_category[cat] = []
+            if name not in index.products_by_category[cat]:
+                index.products_by_category[cat].append(name)
+
+        index.cube = self.cube.extended(
+            years, month_nums, categories, names,
+            delta[SOLD_COL].to_numpy(), delta[STOCK_COL].to_numpy(), prices[start:])
+        return index
+
+
+def latest_period_stock(rows, years, month_nums, stock):
+    # Stock summed over every row (e.g. every store) of the latest (year, month) in `rows`,
+    # which are sorted by (year, month)
+    periods = years[rows].astype(np.int64) * 12 + month_nums[rows]
+    latest = rows[np.searchsorted(periods, periods[-1]):]
+    return int(stock[latest].sum())
+
+
+def price_values(df):
+    # Prices are stored as float32 (see data_cache.COMPACT_DTYPES); money math is done on
+    # float64 values rounded back to whole cents, which is what the workbook holds
+    return np.round(df['product_price'].to_numpy(dtype=np.float64), 2)
+
+
+def month_numbers(series):
+    # Month names -> 1..12 (0 if unknown) as int8; categoricals are mapped once per category, not per row
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        lookup = np.array([MONTH_NUMBERS.get(str(c), 0) for c in series.cat.categories] + [0], dtype=np.int8)
+        return lookup[series.cat.codes.to_numpy()]
+    return series.astype(str).map(MONTH_NUMBERS).fillna(0).to_numpy().astype(np.int8)
+
+
+def concat_frames(old, new):
+    # Append `new` to `old`, keeping categorical columns categorical (categories are unioned)
+    columns = {}
+    for col in old.columns:
+        if isinstance(old[col].dtype, pd.CategoricalDtype):
+            columns[col] = union_categoricals(
+                [pd.Categorical(old[col]), pd.Categorical(new[col].astype(str))], ignore_order=True)
+        else:
+            columns[col] = np.concatenate([old[col].to_numpy(), new[col].to_numpy()])
+    return pd.DataFrame(columns)
+
+
+def chain_hash(base_hash, delta_hash):
+    # Hash of a dataset after appending a delta, so replaying the same deltas gives the same hash
+    return hashlib.sha256(f"{base_hash}:{delta_hash}".encode()).hexdigest()
+
 
 class DataLoader:
-    def __init__(self):
-        self.file_path = "../full_dataset_monthly_storage_fixed.xlsx"
-        try:
-            self.df = pd.read_excel(self.file_path)
-            # Normalize column names
-            self.df.columns = [c.strip() for c in self.df.columns]
-        except Exception as e:
-            print(f"Error loading data: {e}")
-            self.df = pd.DataFrame() # Empty fallback
-
-        self.month_map = {
-            1: "January", 2: "February", 3: "March", 4: "April",
-            5: "May", 6: "June", 7: "July", 8: "August",
-            9: "September", 10: "October", 11: "November", 12: "December"
+    def __init__(self, file_path=DEFAULT_DATA_PATH, use_cache=True, cache_dir=None, df=None):
+        # Pass `df` to serve an in-memory frame (benchmarks, synthetic data) instead of reading a file
+        self.file_path = file_path
+        self._source_df = df
+        self.cache = ColumnarCache(file_path, cache_dir) if use_cache and df is None else None
+        self.df = pd.DataFrame()
+        # Bumped on every (re)load so consumers can tell when their derived state is stale
+        self.version = 0
+        # Content hash of the source workbook plus any ingested deltas (None if nothing is loaded)
+        self.data_hash = None
+        self.base_hash = None
+        # Ingested monthly deltas are persisted here and replayed on every reload
+        if df is None:
+            base_dir = os.path.dirname(os.path.abspath(file_path))
+            stem = os.path.splitext(os.path.basename(file_path))[0]
+            self.deltas_dir = os.path.join(base_dir, '.cache', f"{stem}.ingested")
+        else:
+            self.deltas_dir = None
+        self._reload_lock = threading.Lock()
+        # (version, store) -> DataLoader over that store's rows
+        self._store_views = {}
+        self._catalog_cache = (None, [])
+
+        self.month_map = MONTH_MAP
+        self.index = DatasetIndex(self.df)
+
+        self.reload()
+
+    @timed("data_loader.reload")
+    def reload(self):
+        with self._reload_lock:
+            try:
+                if self._source_df is not None:
+                    df, data_hash = compact_frame(self._source_df), frame_digest(self._source_df)
+                elif self.cache is not None:
+                    df, data_hash = self.cache.load_or_build(self._read_workbook)
+                else:
+                    df, data_hash = compact_frame(self._read_workbook(self.file_path)), file_digest(self.file_path)
+            except Exception as e:
+                print(f"Error loading data: {e}")
+                df, data_hash = pd.DataFrame(), None # Empty fallback
+
+            # Hash of the workbook itself, which ingested deltas are recorded against
+            self.base_hash = data_hash
+            deltas = self._load_deltas(data_hash)
+            if deltas and not df.empty:
+                df = concat_frames(df, pd.concat(deltas, ignore_index=True))
+                for delta in deltas:
+                    data_hash = chain_hash(data_hash, frame_digest(delta))
+
+            with span("data_loader.build_index"):
+                index = DatasetIndex(df)
+
+            # Swap the frame and its index together so concurrent readers never see a half-loaded state
+            self.index = index
+            self.df = df
+            self.data_hash = data_hash
+            self.version += 1
+            return self.version
+
+    @timed("data_loader.ingest")
+    def ingest(self, rows, persist=True):
+        # Append new rows (e.g. one month of sales/stock) without re-reading the workbook.
+        # The index is extended for the new rows only. Returns the normalized delta frame.
+        delta = self.normalize_rows(rows)
+        with self._reload_lock:
+            if persist and self.deltas_dir is not None:
+                self._save_delta(delta)
+
+            start = len(self.df)
+            df = concat_frames(self.df, delta) if start else delta
+            with span("data_loader.extend_index"):
+                index = self.index.extended(df, start)
+
+            self.index = index
+            self.df = df
+            self.data_hash = chain_hash(self.data_hash, frame_digest(delta))
+            self.version += 1
+        return delta
+
+    def normalize_rows(self, rows):
+        # rows: DataFrame or list of dicts, in the workbook's column layout
+        delta = rows.copy() if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        delta.columns = [str(c).strip() for c in delta.columns]
+        missing = [c for c in REQUIRED_COLUMNS if c not in delta.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}")
+        if delta.empty:
+            raise ValueError("No rows to ingest")
+
+        bad_months = set(delta['month'].astype(str)) - set(MONTH_NUMBERS)
+        if bad_months:
+            raise ValueError(f"Unknown month names: {', '.join(sorted(bad_months))}")
+
+        if not self.df.empty:
+            if STORE_COL in self.df.columns and (STORE_COL not in delta.columns or delta[STORE_COL].isna().any()):
+                raise ValueError(f"Missing columns: {STORE_COL} (every row needs one in multi-store data)")
+            delta = self._with_defaults(delta.reindex(columns=self.df.columns))
+            empty = [c for c in self.df.columns if delta[c].isna().any()]
+            if empty:
+                raise ValueError(f"Missing values in columns: {', '.join(empty)}")
+            for col in self.df.columns:
+                if pd.api.types.is_numeric_dtype(self.df[col].dtype):
+                    delta[col] = pd.to_numeric(delta[col]).astype(self.df[col].dtype)
+        return compact_frame(delta.reset_index(drop=True))
+
+    def _with_defaults(self, delta):
+        # Columns outside REQUIRED_COLUMNS: initial stock is sold + remaining, the rest carry over
+        # from the product's latest row, or fall back to defaults for a new product
+        if 'Initial_stock_for_month' in delta.columns:
+            delta['Initial_stock_for_month'] = delta['Initial_stock_for_month'].fillna(
+                pd.to_numeric(delta[SOLD_COL]) + pd.to_numeric(delta[STOCK_COL]))
+        latest = self.df.drop_duplicates('product_name', keep='last')
+        names = delta['product_name'].astype(str)
+        fallbacks = {
+            'product_id': names,
+            'product_type': 'Unknown',
+            'supplier_id': 'Unknown',
+            'purchase_price': pd.to_numeric(delta['product_price']) * 0.7,  # Same 30% margin as the analysis
         }
+        for col, fallback in fallbacks.items():
+            if col not in delta.columns:
+                continue
+            known = pd.Series(latest[col].astype(object).to_numpy(), index=latest['product_name'].astype(str).to_numpy())
+            delta[col] = delta[col].astype(object).fillna(names.map(known)).fillna(fallback)
+        return delta
 
+    def _save_delta(self, delta):
+        os.makedirs(self.deltas_dir, exist_ok=True)
+        base_path = os.path.join(self.deltas_dir, "base.json")
+        if not os.path.exists(base_path):
+            def write_base(tmp):
+                with open(tmp, "w") as f:
+                    json.dump({"data_hash": self.base_hash}, f)
+            self._write_atomic(base_path, write_base)
+        # Time-ordered and unique, so the CLI and a running API never pick the same name
+        path = os.path.join(self.deltas_dir, f"{time.time_ns():020d}-{uuid.uuid4().hex[:8]}.pkl")
+        self._write_atomic(path, delta.to_pickle)
+
+    @staticmethod
+    def _write_atomic(path, write):
+        tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+        write(tmp)
+        os.replace(tmp, path)
+
+    def _load_deltas(self, base_hash):
+        # Deltas only apply to the workbook they were ingested on top of. If the workbook has
+        # changed since (e.g. replaced by one that already has the new month), they are moved aside
+        # instead of being counted twice.
+        if self.deltas_dir is None or not os.path.isdir(self.deltas_dir):
+            return []
+        names = sorted(f for f in os.listdir(self.deltas_dir) if f.endswith('.pkl'))
+        base_path = os.path.join(self.deltas_dir, "base.json")
+        if names and base_hash is not None and os.path.exists(base_path):
+            with open(base_path) as f:
+                recorded = json.load(f).get("data_hash")
+            if recorded != base_hash:
+                stale = f"{self.deltas_dir}.stale-{time.strftime('%Y%m%d-%H%M%S')}"
+                os.replace(self.deltas_dir, stale)
+                print(f"Workbook changed since {len(names)} delta(s) were ingested; moved them to {stale}")
+                return []
+        return [pd.read_pickle(os.path.join(self.deltas_dir, f)) for f in names]
+
+    @staticmethod
+    @timed("data_loader.read_excel")
+    def _read_workbook(path):
+        df = pd.read_excel(path)
+        # Normalize column names
+        df.columns = [c.strip() for c in df.columns]
+        return df
+
+    @timed("data_loader.get_sales_data")
     def get_sales_data(self, year, month):
-        if self.df.empty:
+        idx = self.index
+        if idx.df.empty:
             return {"total_sold": 0, "trend": []}
         
-        month_name = self.month_map.get(month)
-        filtered = self.df[(self.df['year'] == year) & (self.df['month'] == month_name)]
-        
-        total_sold = int(filtered['total_units_sold_in_month'].sum())
+        total_sold = idx.cube.units_sold(year, month)
         
         # For trend, since we only have monthly data, we can't show daily trend from this file.
         # We'll mock the daily trend based on the total.
@@ -40,114 +405,172 @@ class DataLoader:
             "trend": trend
         }
 
+    @timed("data_loader.get_storage_data")
     def get_storage_data(self, year=None, month=None):
-        if self.df.empty:
+        idx = self.index
+        if idx.df.empty:
             return {}
         
-        # If year/month provided, filter. Else use latest.
+        # If year/month provided, filter. Else use totals across all months.
+        # Return dict of product_name -> remaining stock (summed if a product has several rows)
         if year and month:
-            month_name = self.month_map.get(month)
-            filtered = self.df[(self.df['year'] == year) & (self.df['month'] == month_name)]
-        else:
-            filtered = self.df
-            
-        # Return dict of product_name -> remaining stock
-        # If multiple entries for same product (e.g. different suppliers?), sum them? 
-        # Or just take the first. The dataset seems to have one row per product per month.
-        storage = filtered.groupby('product_name')['Total product remaining in stock for that month'].sum().to_dict()
-        return storage
+            stock = idx.cube.period_products.get((int(year), int(month)), {})
+            return dict(sorted(stock.items()))
+        return dict(idx.total_stock)
 
+    @timed("data_loader.get_product_stock")
     def get_product_stock(self, product_name, year=None, month=None):
-        if self.df.empty:
+        idx = self.index
+        if idx.df.empty:
             return 0
             
         # If specific date requested
         if year and month:
-             month_name = self.month_map.get(month)
-             filtered = self.df[(self.df['year'] == year) & (self.df['month'] == month_name) & (self.df['product_name'] == product_name)]
-             if not filtered.empty:
-                 return int(filtered['Total product remaining in stock for that month'].sum())
+            rows = idx.period_product_rows.get((int(year), int(month), product_name))
+            if rows is not None:
+                count("rows_scanned_total", len(rows))
+                return int(idx.stock[rows].sum())
         
-        # Fallback to latest available for that product
-        filtered = self.df[self.df['product_name'] == product_name]
-        if not filtered.empty:
-            # Assuming data is sorted or we can sort by year/month. 
-            # For now just taking the last row as "latest" might be risky if unsorted.
-            # Let's try to find the entry with max year/month.
-            # But month is string.
-            return int(filtered.iloc[-1]['Total product remaining in stock for that month'])
-            
-        return 0
+        # Fallback to latest available (by year, month) for that product
+        return idx.latest_stock.get(product_name, 0)
+
+    def get_stock_levels(self, products, year=None, month=None):
+        # get_product_stock for many products at once, from the cube's per-period totals
+        idx = self.index
+        latest = idx.latest_stock
+        period = idx.cube.period_products.get((int(year), int(month)), {}) if year and month else {}
+        return np.fromiter((period.get(name, latest.get(name, 0)) for name in products), dtype=np.int64,
+                           count=len(products))
+
+    def get_prices(self, products):
+        # Mean price per product, as in get_product_details
+        mean_price = self.index.mean_price
+        return np.fromiter((mean_price.get(name, 0) for name in products), dtype=np.float64, count=len(products))
 
     def check_supplier_availability(self, product_name, amount):
-        # We can check 'supplier_id' in the df.
         # If a supplier exists for the product, we assume available.
-        if self.df.empty:
-            return False
-        exists = not self.df[self.df['product_name'] == product_name].empty
-        return exists
+        return product_name in self.index.product_rows
 
     def get_categories(self):
-        if self.df.empty:
-            return []
-        return self.df['product_category'].unique().tolist()
+        return list(self.index.categories)
 
     def get_products_by_category(self, category):
-        if self.df.empty:
-            return []
-        return self.df[self.df['product_category'] == category]['product_name'].unique().tolist()
+        return list(self.index.products_by_category.get(category, []))
     
     def get_all_data(self):
         return self.df
 
     def get_product_details(self, product_name):
-        if self.df.empty:
-            return {"price": 0}
-        
-        filtered = self.df[self.df['product_name'] == product_name]
-        if not filtered.empty:
-            # Return the mean price (in case it varies) or just the first one
-            price = float(filtered['product_price'].mean())
-            return {"price": price}
-        return {"price": 0}
+        # Mean price, in case it varies across months
+        return {"price": self.index.mean_price.get(product_name, 0)}
 
+    @timed("data_loader.get_monthly_trends")
     def get_monthly_trends(self, year):
-        if self.df.empty:
+        idx = self.index
+        if idx.df.empty:
             return []
         
         trends = []
         for m_num in range(1, 13):
-            m_name = self.month_map[m_num]
-            filtered = self.df[(self.df['year'] == year) & (self.df['month'] == m_name)]
-            sales = 0
-            if not filtered.empty:
-                sales = int(filtered['total_units_sold_in_month'].sum())
-            
+            sales = idx.cube.units_sold(year, m_num)
             trends.append({
-                "month": m_name[:3], # Short name: Jan, Feb, etc.
+                "month": self.month_map[m_num][:3], # Short name: Jan, Feb, etc.
                 "sales": sales
             })
         return trends
 
-    def get_unique_products(self):
-        if self.df.empty:
-            return []
-        
-        # Get unique product names and categories
-        # Taking the last occurrence to pretty much ensure valid data
-        products_df = self.df[['product_name', 'product_category']].drop_duplicates(subset=['product_name'])
-        
-        result = []
-        for _, row in products_df.iterrows():
-            # Get latest stock for this product
-            stock = self.get_product_stock(row['product_name'])
-            
-            result.append({
-                "id": row['product_name'], # Using name as ID for consistency with backend logic
-                "name": row['product_name'],
-                "category": row['product_category'],
-                "remaining_stock": stock,
-                "supplier_id": "SPL-GEN" # Mock supplier ID
-            })
-            
-        return sorted(result, key=lambda x: x['name'])
+    @timed("data_loader.get_trends")
+    def get_trends(self, start_year, end_year, categories=None, product=None):
+        # Monthly units sold, remaining stock and average price over a range of years, either
+        # for the whole catalog, per category, or for a single product
+        idx = self.index
+        if product is not None:
+            row = idx.first_row.get(product)
+            category = str(idx.df['product_category'].iloc[row]) if row is not None else None
+            return [{"product": product, "category": category,
+                     "points": idx.cube.series(start_year, end_year, category, product)}]
+        if not categories:
+            return [{"category": None, "points": idx.cube.series(start_year, end_year)}]
+        return [{"category": cat, "points": idx.cube.series(start_year, end_year, cat)} for cat in categories]
+
+    def get_stores(self):
+        if STORE_COL not in self.df.columns:
+            return [DEFAULT_STORE]
+        return sorted(pd.unique(self.df[STORE_COL].astype(str)).tolist())
+
+    def for_store(self, store):
+        # Loader over one store's rows; the loader itself when the data has no store column.
+        # Views are built once per data version.
+        if STORE_COL not in self.df.columns:
+            return self
+        key = (self.version, store)
+        view = self._store_views.get(key)
+        if view is None:
+            df = self.df
+            view = DataLoader(df=df[(df[STORE_COL] == store).to_numpy()].reset_index(drop=True))
+            self._store_views = {k: v for k, v in self._store_views.items() if k[0] == self.version}
+            self._store_views[key] = view
+        return view
+
+    def memory_report(self):
+        # Approximate resident bytes of the dataset and its derived lookup structures
+        idx = self.index
+        df = self.df
+        columns = {
+            col: {"dtype": str(df[col].dtype), "bytes": int(df[col].memory_usage(deep=True, index=False))}
+            for col in df.columns
+        }
+        row_lists = [idx.product_rows, idx.period_rows, idx.period_product_rows]
+        index_bytes = sum(rows.nbytes for table in row_lists for rows in table.values())
+        index_bytes += sum(getattr(idx, name).nbytes for name in ('names', 'month_nums') if hasattr(idx, name))
+        return {
+            "rows": len(df),
+            "frame_bytes": sum(c["bytes"] for c in columns.values()),
+            "index_bytes": int(index_bytes),
+            "cube_cells": len(idx.cube.cells),
+            "columns": columns,
+        }
+
+    @timed("data_loader.get_unique_products")
+    def get_unique_products(self, category=None):
+        # Catalog sorted by name, optionally one category only
+        catalog = self._catalog()
+        if category is not None:
+            return [p for p in catalog if p["category"] == category]
+        return list(catalog)
+
+    def _catalog(self):
+        # Built once per data version from the index: category from the product's first row in
+        # file order, stock from its latest (year, month)
+        cached_version, catalog = self._catalog_cache
+        # Version before index: a concurrent reload can only make the cached copy look older
+        version = self.version
+        if cached_version == version:
+            return catalog
+        idx = self.index
+        if idx.df.empty:
+            catalog = []
+        else:
+            categories = idx.df['product_category'].to_numpy()
+            catalog = [{
+                "id": name,  # Using name as ID for consistency with backend logic
+                "name": name,
+                "category": str(categories[idx.first_row[name]]),
+                "remaining_stock": idx.latest_stock[name],
+                "supplier_id": "SPL-GEN",  # Mock supplier ID
+            } for name in sorted(idx.first_row)]
+        self._catalog_cache = (version, catalog)
+        return catalog
+
+
+# Process-wide store shared by the API, the predictor and the optimizer.
+_shared_loader = None
+_shared_lock = threading.Lock()
+
+def get_data_loader():
+    global _shared_loader
+    if _shared_loader is None:
+        with _shared_lock:
+            if _shared_loader is None:
+                _shared_loader = DataLoader()
+    return _shared_loader
@@ -0,0 +1,210 @@
+"""
+Rolling-origin evaluation of the demand model.
+
+The history is split by (year, month): each fold trains on every month before its test window
+and scores the next `horizon` months, with the window rolling forward one step per fold. Folds
+(and model variants) run in parallel worker processes, each fit using its share of the cores.
+Scoring is one batched predict per fold, reported as MAE/MAPE overall and per category along
+with training time and inference throughput.
+
+    python evaluation.py --folds 6 --max-depth 4 6 --n-estimators 100 200
+"""
+import argparse
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+from data_loader import DEFAULT_DATA_PATH, DataLoader, month_numbers
+from ml_engine import N_ESTIMATORS, fit_regressor, training_matrix
+
+# Columns that go through a LabelEncoder; test rows with labels a fold never saw are skipped
+LABEL_COLUMNS = ['product_category', 'month', 'season']
+
+
+def period_keys(df):
+    # Months since year 0, so periods sort and compare as integers
+    return df['year'].to_numpy().astype(np.int64) * 12 + month_numbers(df['month']).astype(np.int64) - 1
+
+
+def period_label(key):
+    return f"{key // 12}-{key % 12 + 1:02d}"
+
+
+def rolling_origin_splits(df, folds=3, horizon=1, min_train_periods=6):
+    # [(train row positions, test row positions, test period labels)], oldest origin first
+    keys = period_keys(df)
+    periods = np.unique(keys)
+    first_test = len(periods) - folds * horizon
+    if first_test < min_train_periods:
+        raise ValueError(
+            f"{len(periods)} months of history is not enough for {folds} folds of {horizon} month(s) "
+            f"with at least {min_train_periods} training months")
+
+    splits = []
+    for i in range(folds):
+        test_periods = periods[first_test + i * horizon:first_test + (i + 1) * horizon]
+        train = np.flatnonzero(keys < test_periods[0])
+        test = np.flatnonzero(np.isin(keys, test_periods))
+        splits.append((train, test, [period_label(p) for p in test_periods]))
+    return splits
+
+
+def evaluate_fold(train, test, params, n_jobs=None):
+    # Fit on `train` with fresh encoders and score `test` in one predict call. Errors are returned
+    # as per-category sums so folds can be pooled exactly.
+    le_cat, le_month, le_season = LabelEncoder(), LabelEncoder(), LabelEncoder()
+    X, y = training_matrix(train, le_cat, le_month, le_season, fit=True)
+    start = time.perf_counter()
+    model = fit_regressor(X, y, n_jobs=n_jobs, **params)
+    train_s = time.perf_counter() - start
+
+    known = np.ones(len(test), dtype=bool)
+    for col in LABEL_COLUMNS:
+        known &= test[col].astype(str).isin(set(train[col].astype(str))).to_numpy()
+    scored = test[known]
+    X_test, y_test = training_matrix(scored, le_cat, le_month, le_season)
+    start = time.perf_counter()
+    predicted = model.predict(X_test)
+    predict_s = time.perf_counter() - start
+
+    return {
+        "train_rows": len(train),
+        "test_rows": len(scored),
+        "skipped_rows": int((~known).sum()),
+        "train_s": train_s,
+        "predict_s": predict_s,
+        "errors": error_sums(scored['product_category'].astype(str).to_numpy(), y_test, predicted),
+    }
+
+
+def error_sums(categories, actual, predicted):
+    # {category: [rows, sum |error|, sum |error| / actual, rows with actual > 0]}
+    actual = np.asarray(actual, dtype=np.float64)
+    abs_error = np.abs(np.asarray(predicted, dtype=np.float64) - actual)
+    nonzero = actual > 0
+    ape = np.divide(abs_error, actual, out=np.zeros_like(abs_error), where=nonzero)
+    sums = {}
+    for cat in np.unique(categories):
+        rows = categories == cat
+        sums[str(cat)] = [int(rows.sum()), float(abs_error[rows].sum()), float(ape[rows].sum()),
+                          int(nonzero[rows].sum())]
+    return sums
+
+
+def summarize(sums):
+    # Pooled MAE/MAPE over one or more error_sums dicts
+    rows = sum(s[0] for s in sums)
+    nonzero = sum(s[3] for s in sums)
+    return {
+        "rows": rows,
+        "mae": round(sum(s[1] for s in sums) / rows, 3) if rows else None,
+        "mape": round(100 * sum(s[2] for s in sums) / nonzero, 2) if nonzero else None,
+    }
+
+
+def variant_grid(n_estimators=None, max_depth=None, learning_rate=None):
+    # Cartesian product of the given settings; unset ones keep XGBoost's defaults
+    options = {
+        "n_estimators": n_estimators or [N_ESTIMATORS],
+        "max_depth": max_depth or [None],
+        "learning_rate": learning_rate or [None],
+    }
+    return [{k: v for k, v in zip(options, values) if v is not None}
+            for values in itertools.product(*options.values())]
+
+
+def evaluate(df, variants=None, folds=3, horizon=1, workers=None, min_train_periods=6):
+    variants = variants or variant_grid()
+    splits = rolling_origin_splits(df, folds, horizon, min_train_periods)
+    jobs = [(v, f) for v in range(len(variants)) for f in range(len(splits))]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs)))
+    # Split the cores between concurrent fits instead of oversubscribing them
+    n_jobs = max(1, (os.cpu_count() or 1) // workers)
+
+    start = time.perf_counter()
+    args = [(df.iloc[splits[f][0]], df.iloc[splits[f][1]], variants[v], n_jobs) for v, f in jobs]
+    if workers == 1:
+        results = [evaluate_fold(*a) for a in args]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(evaluate_fold, *zip(*args)))
+    wall_s = time.perf_counter() - start
+
+    report = []
+    for v, params in enumerate(variants):
+        fold_results = [(splits[f][2], r) for (jv, f), r in zip(jobs, results) if jv == v]
+        per_category = {}
+        for _, r in fold_results:
+            for cat, s in r["errors"].items():
+                per_category.setdefault(cat, []).append(s)
+        test_rows = sum(r["test_rows"] for _, r in fold_results)
+        predict_s = sum(r["predict_s"] for _, r in fold_results)
+        report.append({
+            "params": params,
+            **summarize([s for _, r in fold_results for s in r["errors"].values()]),
+            "categories": {cat: summarize(s) for cat, s in sorted(per_category.items())},
+            "folds": [{
+                "test_periods": periods,
+                "train_rows": r["train_rows"],
+                "skipped_rows": r["skipped_rows"],
+                "train_s": round(r["train_s"], 3),
+                **summarize(list(r["errors"].values())),
+            } for periods, r in fold_results],
+            "train_s": round(sum(r["train_s"] for _, r in fold_results), 3),
+            "predict_rows_per_s": round(test_rows / predict_s) if predict_s else None,
+        })
+
+    best = min((r for r in report if r["mae"] is not None), key=lambda r: r["mae"], default=None)
+    return {
+        "folds": folds,
+        "horizon": horizon,
+        "workers": workers,
+        "n_jobs": n_jobs,
+        "wall_s": round(wall_s, 3),
+        "variants": report,
+        "best": best["params"] if best else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rolling-origin evaluation and model selection for the demand model")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Path to the dataset workbook")
+    parser.add_argument("--history", type=int, default=1,
+                        help="Repeat the history this many times into earlier years (synthetic, for timing)")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--horizon", type=int, default=1, help="Months scored per fold")
+    parser.add_argument("--min-train", type=int, default=6, help="Months of history the first fold trains on")
+    parser.add_argument("--workers", type=int, default=None, help="Parallel fold fits (default: one per core)")
+    parser.add_argument("--n-estimators", type=int, nargs="+")
+    parser.add_argument("--max-depth", type=int, nargs="+")
+    parser.add_argument("--learning-rate", type=float, nargs="+")
+    parser.add_argument("--output", help="Also write the full report to this JSON file")
+    args = parser.parse_args()
+
+    df = DataLoader(args.data).get_all_data()
+    if args.history > 1:
+        from benchmark import make_synthetic_frame
+        df = make_synthetic_frame(df, year_scale=args.history)
+
+    variants = variant_grid(args.n_estimators, args.max_depth, args.learning_rate)
+    report = evaluate(df, variants, args.folds, args.horizon, args.workers, args.min_train)
+
+    print(f"{len(df)} rows, {args.folds} folds x {len(variants)} variant(s) on {report['workers']} worker(s) "
+          f"in {report['wall_s']:.1f}s")
+    for r in report["variants"]:
+        print(f"{json.dumps(r['params'])}: MAE {r['mae']}  MAPE {r['mape']}%  "
+              f"train {r['train_s']:.2f}s  predict {r['predict_rows_per_s']} rows/s")
+        for cat, s in r["categories"].items():
+            print(f"    {cat:<24} MAE {s['mae']:>9}  MAPE {s['mape']:>7}%  ({s['rows']} rows)")
+    print(f"Best: {json.dumps(report['best'])}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
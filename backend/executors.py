@@ -0,0 +1,147 @@
+import asyncio
+import contextvars
+import functools
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import metrics
+
+
+class Overloaded(Exception):
+    # Raised when an executor's queue is full; the API turns it into a 429
+    def __init__(self, name):
+        super().__init__(f"{name} executor is at capacity")
+        self.name = name
+
+
+class BoundedExecutor:
+    """
+    Thread or process pool with admission control. At most `max_pending` tasks may be
+    queued or running at once; beyond that acquire() fails fast with Overloaded instead
+    of letting requests pile up behind the pool. A slot is held until the underlying
+    task actually finishes, even if the awaiting request was cancelled.
+    """
+
+    def __init__(self, name, factory, max_workers, max_pending):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self._factory = factory
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @property
+    def executor(self):
+        # Created on first use, so importing the app doesn't fork worker processes
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._factory(max_workers=self.max_workers)
+        return self._executor
+
+    def acquire(self, slots=1):
+        # All-or-nothing reservation of `slots` queue places
+        with self._lock:
+            if self.pending + slots > self.max_pending:
+                metrics.registry.incr("executor_rejected_total", executor=self.name)
+                raise Overloaded(self.name)
+            self.pending += slots
+            metrics.registry.set_gauge("executor_pending", self.pending, executor=self.name)
+
+    def release(self, slots=1):
+        with self._lock:
+            self.pending -= slots
+            metrics.registry.set_gauge("executor_pending", self.pending, executor=self.name)
+
+    def submit(self, fn, *args, **kwargs):
+        # For callers that already hold slots (see acquire); returns an awaitable future
+        return asyncio.wrap_future(self._submit(fn, *args, **kwargs))
+
+    async def run(self, fn, *args, **kwargs):
+        self.acquire()
+        try:
+            future = self._submit(fn, *args, **kwargs)
+        except BaseException:
+            self.release()
+            raise
+        future.add_done_callback(lambda _: self.release())
+        return await asyncio.wrap_future(future)
+
+    async def map(self, fn, items):
+        # fn(*item) for every item, fed through a window of at most one slot per worker so a
+        # large fan-out can't flood the queue. Results come back in input order; failures are
+        # returned as exception objects (like asyncio.gather(return_exceptions=True)).
+        window = min(len(items), self.max_workers)
+        if window == 0:
+            return []
+        self.acquire(window)
+        results = [None] * len(items)
+        running = {}
+        try:
+            for i, item in enumerate(items):
+                running[self.submit(fn, *item)] = i
+                if len(running) >= window:
+                    await self._collect(running, results)
+            while running:
+                await self._collect(running, results)
+            return results
+        finally:
+            for future in running:
+                future.cancel()
+            self.release(window)
+
+    @staticmethod
+    async def _collect(running, results):
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for future in done:
+            i = running.pop(future)
+            results[i] = future.exception() or future.result()
+
+    def _submit(self, fn, *args, **kwargs):
+        call = functools.partial(fn, *args, **kwargs)
+        if isinstance(self.executor, ThreadPoolExecutor):
+            # Threads see the request's context, so ?profile=1 still captures their spans
+            call = functools.partial(contextvars.copy_context().run, call)
+        return self.executor.submit(call)
+
+    def stats(self):
+        return {"max_workers": self.max_workers, "max_pending": self.max_pending, "pending": self.pending}
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+_cpus = os.cpu_count() or 1
+
+# CPU-bound GA runs; one worker process per core
+optimization = BoundedExecutor(
+    "optimization", ProcessPoolExecutor,
+    max_workers=_env_int("OPTIMIZATION_WORKERS", _cpus),
+    max_pending=_env_int("OPTIMIZATION_QUEUE", 4 * _cpus),
+)
+
+# Sharded demand analysis; each worker process stands in for a node and keeps its own copy
+# of the dataset and model
+analysis = BoundedExecutor(
+    "analysis", ProcessPoolExecutor,
+    max_workers=_env_int("ANALYSIS_WORKERS", _cpus),
+    max_pending=_env_int("ANALYSIS_QUEUE", 4 * _cpus),
+)
+
+# Model inference and other blocking work (XGBoost releases the GIL while predicting)
+inference = BoundedExecutor(
+    "inference", ThreadPoolExecutor,
+    max_workers=_env_int("INFERENCE_WORKERS", min(4, _cpus)),
+    max_pending=_env_int("INFERENCE_QUEUE", 32),
+)
+
+metrics.registry.describe("executor_pending", "Tasks queued or running per executor")
+metrics.registry.describe("executor_rejected_total", "Requests turned away with 429 because an executor was full")
@@ -0,0 +1,32 @@
+import argparse
+import pandas as pd
+from data_loader import DEFAULT_DATA_PATH, DataLoader
+from ml_engine import DemandPredictor
+from model_registry import DEFAULT_MODEL_DIR, ModelRegistry
+
+
+def read_rows(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Append new monthly rows (CSV/Parquet) to the dataset and warm-start the demand model")
+    parser.add_argument("path", help="CSV or Parquet file in the workbook's column layout")
+    parser.add_argument("--data", default=DEFAULT_DATA_PATH, help="Path to the dataset workbook")
+    parser.add_argument("--models", default=DEFAULT_MODEL_DIR, help="Model registry directory")
+    parser.add_argument("--rounds", type=int, default=10, help="Boosting rounds to add on the new rows")
+    args = parser.parse_args()
+
+    loader = DataLoader(args.data)
+    predictor = DemandPredictor(loader, registry=ModelRegistry(args.models))
+    delta = predictor.ingest(read_rows(args.path), rounds=args.rounds)
+
+    print(f"Ingested {len(delta)} rows; dataset now has {len(loader.get_all_data())} rows.")
+    print(f"Model version {predictor.model_version}. POST /data/reload to pick it up in a running API.")
+
+
+if __name__ == "__main__":
+    main()
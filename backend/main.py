@@ -1,12 +1,89 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional, Dict
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Annotated, List, Literal, Optional, Dict
+from contextlib import asynccontextmanager
+import asyncio
+import hashlib
+import inspect
+import itertools
+import json
+import os
+import resource
+import time
+import numpy as np
 import uvicorn
-from ml_engine import DemandPredictor, GeneticOptimizer
-from data_loader import DataLoader
+from ml_engine import DemandPredictor, OptimumStore, optimize_product
+from data_loader import get_data_loader
+from model_registry import ModelRegistry
+from response_cache import ResponseCache
+from singleflight import SingleFlight
+from executors import Overloaded, analysis, inference, optimization
+from sharding import ShardCoordinator, merge_shards
+from scenarios import run_scenarios
+from serialization import dumps, to_columns, to_rows
+import metrics
 
-app = FastAPI(title="Retail Supply Chain AI")
+# Handlers are async and never block the event loop: GA runs go to the optimization process pool,
+# model work to the inference thread pool, and cache hits / index lookups are answered inline.
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    optimization.shutdown()
+    analysis.shutdown()
+    inference.shutdown()
+
+class InstrumentedJSONResponse(JSONResponse):
+    # orjson encoding (NumPy arrays and scalars natively), timed as its own span. Handlers that
+    # return one directly also skip FastAPI's jsonable_encoder pass over the content.
+    def render(self, content):
+        with metrics.span("response.render"):
+            return dumps(content)
+
+app = FastAPI(title="Retail Supply Chain AI", lifespan=lifespan, default_response_class=InstrumentedJSONResponse)
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded):
+    # Backpressure: shed load instead of queueing behind a saturated pool
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    # Request latency histogram for every route; ?profile=1 adds a per-request span breakdown
+    profile = metrics.start_profile() if request.query_params.get("profile") == "1" else None
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+
+    route = request.scope.get("route")
+    path = route.path if route is not None else "unmatched"
+    metrics.registry.observe("http_request_duration_seconds", elapsed, method=request.method, path=path)
+
+    # call_next wraps every response in a streaming one without media_type, so check the header;
+    # buffering an NDJSON stream to profile it would hold back every line until the last one
+    streamed = response.headers.get("content-type", "").startswith("application/x-ndjson")
+    if profile is not None and not streamed:
+        response = await attach_profile(response, profile, elapsed)
+    return response
+
+async def attach_profile(response, profile, elapsed):
+    # Spans go into a Server-Timing header, and into a "_profile" key when the body is a JSON object
+    body = b"".join([chunk async for chunk in response.body_iterator])
+    spans = {name: {"calls": s["calls"], "ms": round(s["ms"], 3)} for name, s in profile["spans"].items()}
+    breakdown = {"total_ms": round(elapsed * 1000, 3), "spans": spans, "counters": profile["counters"]}
+
+    if response.headers.get("content-type", "").startswith("application/json"):
+        content = json.loads(body)
+        if isinstance(content, dict):
+            content["_profile"] = breakdown
+            body = dumps(content)
+
+    headers = {k: v for k, v in response.headers.items() if k.lower() != "content-length"}
+    headers["Server-Timing"] = ", ".join(
+        [f'{name.replace(".", "-")};dur={s["ms"]}' for name, s in spans.items()] + [f"total;dur={breakdown['total_ms']}"]
+    )
+    return Response(content=body, status_code=response.status_code, headers=headers)
 
 # CORS setup
 app.add_middleware(
@@ -15,12 +92,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count"],
 )
 
-# Initialize modules
-data_loader = DataLoader()
-predictor = DemandPredictor()
-optimizer = GeneticOptimizer()
+# Initialize modules (all share the same in-memory dataset)
+data_loader = get_data_loader()
+predictor = DemandPredictor(data_loader, registry=ModelRegistry())
+response_cache = ResponseCache(max_entries=512, ttl_seconds=300)
+# Previous months' optima, used to warm-start optimization for the next month
+optimum_store = OptimumStore()
+# Identical requests arriving while the first one is still being computed share its result
+single_flight = SingleFlight()
+# Fans large analyses out by (store, category) to the analysis worker processes
+coordinator = ShardCoordinator(
+    data_loader, predictor, workers=analysis, local=inference,
+    min_products=int(os.environ.get("ANALYSIS_SHARD_MIN_PRODUCTS", 500)),
+)
+
+async def response_key(endpoint, params, uses_model=True):
+    # Responses are pure functions of the request, the dataset and the model, so key on all three
+    model_version = None
+    if uses_model:
+        if predictor.data_version != data_loader.version:
+            # (Re)training is slow, keep it off the event loop
+            await inference.run(predictor.ensure_model)
+        model_version = predictor.model_version
+    return response_cache.make_key(endpoint, params, data_loader.data_hash, model_version)
+
+async def cached_response(endpoint, params, compute, uses_model=True):
+    # `compute` may return an awaitable (work handed to an executor); hits never leave the event loop
+    key = await response_key(endpoint, params, uses_model)
+    found, value = response_cache.get(key)
+    if found:
+        return value
+
+    async def compute_and_store():
+        value = compute()
+        if inspect.isawaitable(value):
+            value = await value
+        response_cache.set(key, value)
+        return value
+
+    return await single_flight.do(key, compute_and_store, label=endpoint)
 
 # --- Models ---
 class LoginRequest(BaseModel):
@@ -31,6 +144,11 @@ class AnalysisRequest(BaseModel):
     year: int
     month: int
     holidays: int
+    # Restrict to these stores (multi-store data only); default is every store
+    stores: Optional[List[str]] = None
+
+class ModelReloadRequest(BaseModel):
+    version: Optional[str] = None
 
 class ReorderRequest(BaseModel):
     year: int
@@ -39,65 +157,130 @@ class ReorderRequest(BaseModel):
     item: str
     product: str
     holidays: Optional[int] = 0
+    store: Optional[str] = None
 
 # --- Endpoints ---
 
 @app.post("/auth/login")
-def login(request: LoginRequest):
+async def login(request: LoginRequest):
     if request.username == "admin" and request.password == "admin":
         return {"token": "mock-jwt-token", "user": "admin"}
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
+async def stream_demand_analysis(request, key):
+    # Served from the response cache when a stream or buffered call already computed it; otherwise
+    # identical concurrent streams share one computation and each reader gets every line from the start
+    found, result = response_cache.get(key)
+    if found:
+        for line in cached_demand_lines(result):
+            yield dumps(line) + b"\n"
+        return
+    lines = single_flight.stream(key, lambda: demand_analysis_lines(request, key), label="/analysis/demand?stream")
+    try:
+        async for line in lines:
+            yield dumps(line) + b"\n"
+    except Overloaded as e:
+        # Headers are already sent, so report it in-band and stop
+        yield dumps({"type": "error", "detail": str(e)}) + b"\n"
+
+async def demand_analysis_lines(request, key):
+    # NDJSON: sales_data first, then one line per (store, category) shard as it is computed, then
+    # monthly_trends. The merged result is cached under `key`, the same entry a buffered call uses.
+    sales_data = data_loader.get_sales_data(request.year, request.month)
+    yield {"type": "sales_data", "data": sales_data}
+    shards = []
+    async for shard in coordinator.stream(request.year, request.month, request.holidays, request.stores):
+        shards.append(shard)
+        yield products_line(shard["store"], shard["category"], to_rows(shard["columns"]))
+    monthly_trends = data_loader.get_monthly_trends(request.year)
+    yield {"type": "monthly_trends", "data": monthly_trends}
+    response_cache.set(key, demand_result(sales_data, merge_shards(shards), monthly_trends))
+
+def cached_demand_lines(result):
+    # The lines of a cached /analysis/demand result; rows are in shard order, so each run of
+    # (store, category) is one shard
+    yield {"type": "sales_data", "data": result["sales_data"]}
+    for (store, cat), rows in itertools.groupby(
+            result["product_analysis"], key=lambda row: (row.get("store"), row["category"])):
+        yield products_line(store, cat, list(rows))
+    yield {"type": "monthly_trends", "data": result["monthly_trends"]}
+
+def products_line(store, category, rows):
+    line = {"type": "products", "category": category, "rows": rows}
+    if store is not None:
+        line["store"] = store
+    return line
+
 @app.post("/analysis/demand")
-def analyze_demand(request: AnalysisRequest):
+async def analyze_demand(request: AnalysisRequest, stream: bool = False, layout: Literal["rows", "columns"] = "rows"):
+    # layout=columns returns product_analysis as {"product": [...], "stock": [...], ...}
+    unknown = coordinator.unknown_stores(request.stores)
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown stores: {', '.join(unknown)}")
+    params = {**request.model_dump(), "layout": layout}
+    if stream:
+        # Streams always carry rows
+        key = await response_key("/analysis/demand", {**params, "layout": "rows"})
+        if inference.pending >= inference.max_pending and not response_cache.get(key)[0]:
+            raise Overloaded(inference.name)
+        return StreamingResponse(stream_demand_analysis(request, key), media_type="application/x-ndjson")
+    result = await cached_response("/analysis/demand", params, lambda: build_demand_analysis(request, layout))
+    return InstrumentedJSONResponse(result)
+
+async def build_demand_analysis(request, layout="rows"):
     # Get historical data (aggregate)
     sales_data = data_loader.get_sales_data(request.year, request.month)
     
-    # Get all products and calculate metrics for each
-    categories = data_loader.get_categories()
-    product_analysis = []
-    
-    for cat in categories:
-        products = data_loader.get_products_by_category(cat)
-        for prod in products:
-            # Predict demand
-            predicted = predictor.predict_single_item(prod, request.year, request.month, request.holidays)
-            
-            # Get stock
-            stock = data_loader.get_product_stock(prod, request.year, request.month)
-            
-            # Get details (price)
-            details = data_loader.get_product_details(prod)
-            price = details.get("price", 0)
-            cost = price * 0.7 # Assumption: 30% margin
-            
-            # Calculate reorder
-            reorder = int(predicted - (stock / 2))
-            if reorder < 0: reorder = 0
-            
-            product_analysis.append({
-                "category": cat,
-                "product": prod,
-                "stock": stock,
-                "predicted_demand": predicted,
-                "reorder_amount": reorder,
-                "price": round(price, 2),
-                "cost": round(cost, 2)
-            })
+    # Predict demand for the whole catalog, sharded by store and category for large catalogs
+    analysis_result = await coordinator.analyze(request.year, request.month, request.holidays, request.stores)
             
     # Get monthly trends
     monthly_trends = data_loader.get_monthly_trends(request.year)
 
-    return {
+    return demand_result(sales_data, analysis_result, monthly_trends, layout)
+
+def demand_result(sales_data, analysis_result, monthly_trends, layout="rows"):
+    columns = analysis_result["columns"]
+    result = {
         "sales_data": sales_data,
-        "product_analysis": product_analysis,
+        "product_analysis": columns if layout == "columns" else to_rows(columns),
         "monthly_trends": monthly_trends
     }
+    if "stores" in analysis_result:
+        # Per-store totals, only for multi-store data
+        result["stores"] = analysis_result["stores"]
+    return result
+
+class TrendsRequest(BaseModel):
+    start_year: int
+    end_year: int
+    categories: Optional[List[str]] = None
+    product: Optional[str] = None
+
+@app.post("/analysis/trends")
+async def analyze_trends(request: TrendsRequest):
+    # Served from the aggregate cube, so long multi-year ranges are cheap
+    if request.end_year < request.start_year:
+        raise HTTPException(status_code=400, detail="end_year must not be before start_year")
+    if request.end_year - request.start_year >= 100:
+        raise HTTPException(status_code=400, detail="Range is limited to 100 years")
+    return InstrumentedJSONResponse(await cached_response("/analysis/trends", request.model_dump(), lambda: {
+        "start_year": request.start_year,
+        "end_year": request.end_year,
+        "series": data_loader.get_trends(request.start_year, request.end_year, request.categories, request.product),
+    }, uses_model=False))
 
 @app.post("/supply/reorder")
-def calculate_reorder(request: ReorderRequest):
+async def calculate_reorder(request: ReorderRequest):
+    unknown = coordinator.unknown_stores([request.store] if request.store else None)
+    if unknown:
+        raise HTTPException(status_code=404, detail=f"Unknown store: {request.store}")
+    return await cached_response("/supply/reorder", request.model_dump(), lambda: inference.run(build_reorder, request))
+
+def build_reorder(request):
     predicted_demand = predictor.predict_single_item(request.product, request.year, request.month, request.holidays)
-    remaining_stock = data_loader.get_product_stock(request.product, request.year, request.month)
+    store_loader = data_loader.for_store(request.store) if request.store else data_loader
+    remaining_stock = store_loader.get_product_stock(request.product, request.year, request.month)
     
     reorder_amount = int(predicted_demand - (remaining_stock / 2))
     if reorder_amount < 0:
@@ -119,35 +302,287 @@ class OptimizationRequest(BaseModel):
     year: int
     month: int
     holidays: Optional[int] = 0
+    # Same seed + same input -> same answer
+    seed: Optional[int] = None
+    # Simulated months averaged per fitness evaluation (shared across the population)
+    replications: int = Field(1, ge=1, le=1000)
+    # "auto" picks the exhaustive/coarse-to-fine grid unless it would exceed the simulation budget
+    search: Literal["auto", "ga", "grid"] = "auto"
+    # Seed the GA with this product's optimum from the previous month, if one is known. Off by
+    # default: the answer then depends on what this process optimized before, not just the request.
+    warm_start: bool = False
 
 @app.post("/supply/optimize")
-def optimize_supply(request: OptimizationRequest):
+async def optimize_supply(request: OptimizationRequest):
+    # The warm-start gene is part of the key, so the same inputs still give the same cached answer
+    warm = optimum_store.previous(request.product, request.year, request.month) if request.warm_start else None
+    params = {**request.model_dump(), "warm_start_gene": warm}
+    return await cached_response("/supply/optimize", params, lambda: build_optimization(request, warm))
+
+async def build_optimization(request, warm=None):
     # Predict Demand
-    predicted_demand = predictor.predict_single_item(request.product, request.year, request.month, request.holidays)
+    predicted_demand = await inference.run(
+        predictor.predict_single_item, request.product, request.year, request.month, request.holidays)
     
     # Get Current Stock
     current_stock = data_loader.get_product_stock(request.product, request.year, request.month)
     
-    # Run Genetic Optimization
-    result = optimizer.optimize_supply_chain(request.product, predicted_demand, current_stock)
-    
-    # Add context
-    result["predicted_demand"] = predicted_demand
-    result["current_stock"] = current_stock
-    
+    # Run Genetic Optimization in a worker process (per-request optimizer so the seed fully determines the run)
+    with metrics.span("optimizer.optimize_supply_chain"):
+        result = await optimization.run(
+            optimize_product, request.product, predicted_demand, current_stock, request.seed, request.replications,
+            warm, request.search)
+    count_evaluations(result)
+    optimum_store.record(request.product, request.year, request.month, result)
     return result
 
+def count_evaluations(result):
+    # Worker processes keep their own metrics, so the API counts the search from its result
+    metrics.count("ga_evaluations_total", result.get("evaluations", 0) * result.get("replications", 1))
+
+class IngestRequest(BaseModel):
+    # Rows in the workbook's column layout, e.g. one new month of sales and stock
+    rows: List[Dict]
+    # Extra boosting rounds fitted on the new rows (warm start)
+    warm_start_rounds: int = Field(10, ge=1, le=1000)
+
+@app.post("/data/ingest")
+async def ingest_data(request: IngestRequest):
+    try:
+        delta = await inference.run(predictor.ingest, request.rows, rounds=request.warm_start_rounds)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response_cache.invalidate()
+    return {
+        "rows_ingested": len(delta),
+        "total_rows": len(data_loader.get_all_data()),
+        "data_version": data_loader.version,
+        "data_hash": data_loader.data_hash,
+        "model_version": predictor.model_version,
+    }
+
+class ProductSelection(BaseModel):
+    # Either an explicit product list or a whole category
+    products: Optional[List[str]] = None
+    category: Optional[str] = None
+
+def selected_products(request):
+    # Products named by a ProductSelection, duplicates dropped
+    if request.products:
+        products = list(dict.fromkeys(request.products))
+    elif request.category:
+        products = data_loader.get_products_by_category(request.category)
+    else:
+        raise HTTPException(status_code=400, detail="Provide either products or category")
+    if not products:
+        raise HTTPException(status_code=404, detail="No products found")
+    return products
+
+class BatchOptimizationRequest(ProductSelection):
+    year: int
+    month: int
+    holidays: Optional[int] = 0
+    seed: Optional[int] = None
+    replications: int = Field(1, ge=1, le=1000)
+    search: Literal["auto", "ga", "grid"] = "auto"
+    warm_start: bool = False
+
+@app.post("/supply/optimize/batch")
+async def optimize_supply_batch(request: BatchOptimizationRequest):
+    # Optimize many products in parallel; results are streamed back as NDJSON lines in completion order
+    products = selected_products(request)
+
+    # The batch reserves a window of at most one slot per worker and feeds its products through it,
+    # so a large category can't flood the queue ahead of single /supply/optimize calls
+    window = min(len(products), optimization.max_workers)
+    optimization.acquire(window)
+    try:
+        predictions = await inference.run(
+            predictor.predict_batch, products, request.year, request.month, request.holidays)
+    except BaseException:
+        optimization.release(window)
+        raise
+    stocks = data_loader.get_stock_levels(products, request.year, request.month).tolist()
+
+    # Independent per-product seeds derived from the request seed, so each result is reproducible
+    seeds = [int(child.generate_state(1)[0]) for child in np.random.SeedSequence(request.seed).spawn(len(products))]
+    warm = [optimum_store.previous(prod, request.year, request.month) if request.warm_start else None
+            for prod in products]
+    jobs = iter(zip(products, predictions, stocks, seeds, warm))
+
+    async def stream_results():
+        running, submitted = {}, {}
+        try:
+            for prod, predicted, stock, seed, start in jobs:
+                future = optimization.submit(
+                    optimize_product, prod, int(predicted), stock, seed, request.replications, start, request.search)
+                running[future] = prod
+                submitted[future] = time.perf_counter()
+                if len(running) < window:
+                    continue
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield batch_result_line(future, running.pop(future), submitted.pop(future), request)
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield batch_result_line(future, running.pop(future), submitted.pop(future), request)
+        finally:
+            # Client went away (or we're done): drop anything not started yet
+            for future in running:
+                future.cancel()
+            optimization.release(window)
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+def batch_result_line(future, product, submitted, request):
+    metrics.record_span("optimizer.optimize_supply_chain", time.perf_counter() - submitted)
+    try:
+        result = future.result()
+        count_evaluations(result)
+        optimum_store.record(product, request.year, request.month, result)
+    except Exception as e:
+        result = {"product": product, "error": str(e)}
+    return dumps(result) + b"\n"
+
+class ScenarioRequest(ProductSelection):
+    year: int
+    months: List[int] = Field(..., min_length=1)
+    holidays: List[int] = Field([0], min_length=1)
+    demand_multipliers: List[Annotated[float, Field(ge=0)]] = Field([1.0], min_length=1)
+    # Safety stock as a fraction of each scenario's monthly demand
+    safety_stock_ratio: float = Field(0.1, ge=0)
+    seed: Optional[int] = None
+    replications: int = Field(20, ge=1, le=1000)
+
+@app.post("/supply/scenarios")
+async def supply_scenarios(request: ScenarioRequest):
+    # Every combination of products x months x holidays x demand multipliers in one round trip
+    products = selected_products(request)
+    if any(m < 1 or m > 12 for m in request.months):
+        raise HTTPException(status_code=400, detail="Months must be between 1 and 12")
+
+    async def compute():
+        try:
+            return await inference.run(
+                run_scenarios, predictor, data_loader, products, request.year, request.months, request.holidays,
+                request.demand_multipliers, request.safety_stock_ratio, request.replications, request.seed)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    # The matrices are NumPy arrays, encoded natively by the response class
+    return InstrumentedJSONResponse(
+        await cached_response("/supply/scenarios", {**request.model_dump(), "products": products}, compute))
+
+@app.post("/data/reload")
+async def reload_data():
+    # Re-read the workbook; the model is only retrained if the data hash changed
+    version = await inference.run(reload_dataset)
+    response_cache.invalidate()
+    return {"data_version": version, "data_hash": data_loader.data_hash, "model_version": predictor.model_version}
+
+def reload_dataset():
+    version = data_loader.reload()
+    predictor.load_or_train()
+    return version
+
+@app.get("/model")
+async def get_model_info():
+    return {
+        "model_version": predictor.model_version,
+        "data_hash": predictor.data_hash,
+        "is_trained": predictor.is_trained,
+        "available_versions": [m["version"] for m in predictor.registry.list_versions()],
+    }
+
+@app.post("/model/reload")
+async def reload_model(request: ModelReloadRequest):
+    # Hot-swap to a saved model version (default: latest for the current dataset) without a restart
+    if request.version:
+        version = request.version
+    else:
+        meta = predictor.registry.latest(data_loader.data_hash)
+        if meta is None:
+            raise HTTPException(status_code=404, detail="No saved model for the current dataset")
+        version = meta["version"]
+    try:
+        await inference.run(predictor.load_version, version)
+    except (OSError, ValueError):
+        raise HTTPException(status_code=404, detail=f"Model version not found: {version}")
+    response_cache.invalidate()
+    return {"model_version": predictor.model_version, "data_hash": predictor.data_hash}
+
+@app.get("/metrics")
+async def get_metrics():
+    # Prometheus text exposition format
+    for name, value in response_cache.stats().items():
+        if isinstance(value, (int, float)):
+            metrics.registry.set_gauge("response_cache_" + name, value)
+    stats = single_flight.stats()
+    metrics.registry.set_gauge("singleflight_in_flight", stats["in_flight"])
+    metrics.registry.set_gauge("singleflight_dedup_ratio", stats["dedup_ratio"])
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def get_cache_stats():
+    return {**response_cache.stats(), "singleflight": single_flight.stats()}
+
+@app.get("/executors/stats")
+async def get_executor_stats():
+    return {"optimization": optimization.stats(), "inference": inference.stats()}
+
+@app.get("/data/memory")
+async def get_memory_report():
+    # Dataset footprint of this worker; max RSS covers everything else (model, interpreter, caches)
+    report = data_loader.memory_report()
+    report["process_max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    return report
+
 @app.get("/data/categories")
-def get_categories():
-    return data_loader.get_categories()
+async def get_categories():
+    return await cached_response("/data/categories", {}, data_loader.get_categories, uses_model=False)
 
 @app.get("/data/products/{category}")
-def get_products(category: str):
-    return data_loader.get_products_by_category(category)
+async def get_products(category: str):
+    return await cached_response("/data/products/{category}", {"category": category},
+                           lambda: data_loader.get_products_by_category(category), uses_model=False)
+
+CATALOG_FIELDS = ["id", "name", "category", "remaining_stock", "supplier_id"]
 
 @app.get("/data/products")
-def get_all_products():
-    return data_loader.get_unique_products()
+async def get_all_products(request: Request, category: Optional[str] = None, offset: int = Query(0, ge=0),
+                           limit: Optional[int] = Query(None, ge=1), fields: Optional[str] = None,
+                           layout: Literal["rows", "columns"] = "rows"):
+    # Catalog sorted by name. The page is the response body; X-Total-Count has the number of matching
+    # products. fields=name,category trims each entry; layout=columns sends {"name": [...], ...}.
+    # The ETag only depends on the dataset and the query, so a matching If-None-Match is answered
+    # with 304 before anything is computed.
+    selected = fields.split(",") if fields else CATALOG_FIELDS
+    unknown = [f for f in selected if f not in CATALOG_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+
+    params = {"category": category, "offset": offset, "limit": limit, "fields": selected, "layout": layout}
+    etag = '"' + hashlib.sha256(
+        json.dumps([data_loader.data_hash, params], default=str).encode()).hexdigest()[:32] + '"'
+    if request.headers.get("if-none-match") in (etag, "*"):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    def build_page():
+        catalog = data_loader.get_unique_products(category)
+        end = offset + limit if limit is not None else None
+        if layout == "columns":
+            page = to_columns(catalog[offset:end], selected)
+        else:
+            page = [{f: p[f] for f in selected} for p in catalog[offset:end]]
+        # Rendered once per page and dataset; cache hits send the stored bytes
+        return {"total": len(catalog), "body": InstrumentedJSONResponse(page).body}
+
+    page = await cached_response("/data/products", params, build_page, uses_model=False)
+    return Response(content=page["body"], media_type="application/json", headers={
+        "ETag": etag,
+        "X-Total-Count": str(page["total"]),
+        "Cache-Control": "no-cache",
+    })
 
 if __name__ == "__main__":
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
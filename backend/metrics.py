@@ -0,0 +1,160 @@
+import bisect
+import contextvars
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds (Prometheus-style cumulative upper bounds)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-request profile ({"spans": {name: {"calls", "ms"}}, "counters": {...}}), only set when ?profile=1 is requested
+_profile = contextvars.ContextVar("profile", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Process-local counters, gauges and latency histograms, rendered in the Prometheus
+    text exposition format. Everything is keyed on (metric name, sorted label pairs).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._gauges = {}
+        self._histograms = {}
+        self._help = {}
+
+    def describe(self, name, help_text):
+        self._help[name] = help_text
+
+    def incr(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    def render(self):
+        lines = []
+        with self._lock:
+            lines += self._render_simple(self._counters, "counter")
+            lines += self._render_simple(self._gauges, "gauge")
+
+            seen = set()
+            for (name, labels), hist in sorted(self._histograms.items()):
+                if name not in seen:
+                    lines += self._header(name, "histogram")
+                    seen.add(name)
+                cumulative = 0
+                for bound, count in zip(hist.buckets + (float("inf"),), hist.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {hist.total}")
+                lines.append(f"{name}_count{_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def _render_simple(self, values, kind):
+        lines = []
+        seen = set()
+        for (name, labels), value in sorted(values.items()):
+            if name not in seen:
+                lines += self._header(name, kind)
+                seen.add(name)
+            lines.append(f"{name}{_labels(labels)} {value}")
+        return lines
+
+    def _header(self, name, kind):
+        lines = []
+        if name in self._help:
+            lines.append(f"# HELP {name} {self._help[name]}")
+        lines.append(f"# TYPE {name} {kind}")
+        return lines
+
+
+def _labels(pairs):
+    if not pairs:
+        return ""
+    escaped = (f'{k}="{_escape(v)}"' for k, v in pairs)
+    return "{" + ",".join(escaped) + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
+registry.describe("span_duration_seconds", "Time spent in instrumented hot-path functions")
+registry.describe("http_request_duration_seconds", "End-to-end HTTP request latency")
+registry.describe("predictions_total", "Products scored by the demand model")
+registry.describe("rows_scanned_total", "Dataset rows touched by DataLoader accessors")
+registry.describe("ga_evaluations_total", "Simulated (individual, replication) cost evaluations")
+
+
+@contextmanager
+def span(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start)
+
+
+def record_span(name, elapsed):
+    # For timings that don't fit a with-block, e.g. a future submitted in one place and resolved in another
+    registry.observe("span_duration_seconds", elapsed, span=name)
+    profile = _profile.get()
+    if profile is not None:
+        # Aggregated by name so per-product calls don't grow the profile with the catalog
+        entry = profile["spans"].setdefault(name, {"calls": 0, "ms": 0.0})
+        entry["calls"] += 1
+        entry["ms"] += elapsed * 1000
+
+
+def timed(name):
+    # Decorator form of span()
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def count(name, value=1):
+    registry.incr(name, value)
+    profile = _profile.get()
+    if profile is not None:
+        profile["counters"][name] = profile["counters"].get(name, 0) + value
+
+
+def start_profile():
+    # Returns the profile dict that spans of the current request will be recorded into
+    profile = {"spans": {}, "counters": {}}
+    _profile.set(profile)
+    return profile
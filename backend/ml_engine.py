@@ -1,52 +1,211 @@
+import threading
 import pandas as pd
 import numpy as np
 import xgboost as xgb
 from sklearn.preprocessing import LabelEncoder
-from data_loader import DataLoader
+from data_loader import MONTH_MAP, get_data_loader
+from metrics import count, span, timed
+
+FEATURES = ['product_category_enc', 'product_price', 'month_enc', 'year', 'season_enc', 'No.of holidays in that month']
+TARGET = 'total_units_sold_in_month'
+
+# Boosting rounds for a full fit
+N_ESTIMATORS = 100
+
+# (gene, replication) months simulated at once; the simulation keeps about ten float64 arrays this size
+SIMULATION_CHUNK = 250_000
+
+
+def training_matrix(df, le_cat, le_month, le_season, fit=False):
+    # Features: product_category, product_price, month, year, season, holidays
+    # Target: total_units_sold_in_month
+    # With fit=False, labels the encoders have never seen raise ValueError.
+    X = pd.DataFrame({
+        'product_category_enc': encode_labels(le_cat, df['product_category'], fit),
+        'product_price': df['product_price'].to_numpy(),
+        'month_enc': encode_labels(le_month, df['month'], fit),
+        'year': df['year'].to_numpy(),
+        'season_enc': encode_labels(le_season, df['season'], fit),
+        'No.of holidays in that month': df['No.of holidays in that month'].to_numpy(),
+    }, columns=FEATURES)
+    return X, df[TARGET].to_numpy()
+
+
+def fit_regressor(X, y, n_estimators=N_ESTIMATORS, n_jobs=None, **params):
+    # The production model configuration; evaluation passes variants through **params.
+    # n_jobs=None lets XGBoost use every core.
+    model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=n_estimators, n_jobs=n_jobs, **params)
+    model.fit(X, y)
+    return model
+
+
+def encode_labels(le, series, fit=False):
+    # LabelEncoder over a categorical column: only the distinct labels go through the encoder,
+    # rows are mapped by their category codes, so no per-row string array is materialized.
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype(str).astype('category')
+    codes = series.cat.codes.to_numpy()
+    if (codes < 0).any():
+        values = series.astype(str)
+        return le.fit_transform(values) if fit else le.transform(values)
+    # Only categories that actually occur (ingest can leave unused ones behind)
+    present = np.unique(codes)
+    labels = series.cat.categories.astype(str)[present]
+    if fit:
+        le.fit(labels)
+    lookup = np.zeros(len(series.cat.categories), dtype=np.int64)
+    lookup[present] = le.transform(labels)
+    return lookup[codes]
+
 
 class DemandPredictor:
-    def __init__(self):
+    def __init__(self, data_loader=None, registry=None):
+        self.data_loader = data_loader or get_data_loader()
+        # Optional ModelRegistry; when set, trained models are persisted and reused across restarts
+        self.registry = registry
+        # Dataset version/hash the current model was trained on
+        self.data_version = None
+        self.data_hash = None
+        self.model_version = None
         self.model = None
         self.le_cat = LabelEncoder()
         self.le_month = LabelEncoder()
         self.le_season = LabelEncoder()
         self.is_trained = False
-        self.train_model()
+        self._lock = threading.RLock()
+        # The model is loaded (or trained) lazily on first prediction, not at import time
+
+    def ensure_model(self):
+        if self.data_version != self.data_loader.version:
+            self.load_or_train()
+
+    def load_or_train(self):
+        # Reuse the current model or a saved artifact for this dataset; only retrain when the data hash changed
+        with self._lock:
+            loader = self.data_loader
+            version, data_hash = loader.version, loader.data_hash
+            if self.data_version == version:
+                return
+
+            if self.is_trained and data_hash is not None and self.data_hash == data_hash:
+                self.data_version = version
+                return
+
+            if self.registry is not None and data_hash is not None:
+                meta = self.registry.latest(data_hash)
+                if meta is not None:
+                    try:
+                        self.load_version(meta["version"])
+                        return
+                    except Exception as e:
+                        print(f"Error loading model {meta['version']}: {e}")
 
+            self.train_model()
+
+    @timed("predictor.load_version")
+    def load_version(self, model_version):
+        # Hot-swap to a saved artifact; predictions already running finish on the old model
+        model, encoders, meta = self.registry.load(model_version)
+        with self._lock:
+            self._install(model, encoders["le_cat"], encoders["le_month"], encoders["le_season"])
+            self.model_version = meta["version"]
+            self.data_hash = meta["data_hash"]
+            # An explicitly chosen version stays in place until the dataset is reloaded
+            self.data_version = self.data_loader.version
+        print(f"Loaded model version {model_version}")
+        return meta
+
+    def _install(self, model, le_cat, le_month, le_season):
+        self.model = model
+        self.le_cat = le_cat
+        self.le_month = le_month
+        self.le_season = le_season
+        self.is_trained = True
+
+    def _snapshot(self):
+        with self._lock:
+            return self.model, self.le_cat, self.le_month, self.le_season, self.is_trained
+
+    @timed("predictor.train_model")
     def train_model(self):
-        loader = DataLoader()
-        df = loader.get_all_data()
+        version = self.data_loader.version
+        data_hash = self.data_loader.data_hash
+        df = self.data_loader.get_all_data()
         
         if df.empty:
             print("No data to train model.")
+            self.data_version = version
             return
 
-        # Prepare features and target
-        # Features: product_category, product_price, month, year, season, holidays
-        # Target: total_units_sold_in_month
-        
         try:
-            data = df.copy()
-            
-            # Encode categorical variables
-            data['product_category_enc'] = self.le_cat.fit_transform(data['product_category'].astype(str))
-            data['month_enc'] = self.le_month.fit_transform(data['month'].astype(str))
-            data['season_enc'] = self.le_season.fit_transform(data['season'].astype(str))
-            
-            features = ['product_category_enc', 'product_price', 'month_enc', 'year', 'season_enc', 'No.of holidays in that month']
-            target = 'total_units_sold_in_month'
+            # Encode categorical variables (fresh encoders, so a model being served is never mutated)
+            le_cat, le_month, le_season = LabelEncoder(), LabelEncoder(), LabelEncoder()
+            X, y = training_matrix(df, le_cat, le_month, le_season, fit=True)
             
-            X = data[features]
-            y = data[target]
-            
-            self.model = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=100)
-            self.model.fit(X, y)
-            self.is_trained = True
+            model = fit_regressor(X, y)
+
+            self._publish(model, le_cat, le_month, le_season, version, data_hash, {"rows": len(df), "n_estimators": N_ESTIMATORS})
             print("XGBoost model trained successfully.")
             
         except Exception as e:
             print(f"Error training model: {e}")
 
+    @timed("predictor.update_model")
+    def update_model(self, new_rows, rounds=10):
+        # Warm start: fit `rounds` additional trees on just the new rows on top of the current
+        # booster, instead of refitting everything. Falls back to a full retrain if the new rows
+        # bring categories/months/seasons the encoders have never seen.
+        with self._lock:
+            version = self.data_loader.version
+            data_hash = self.data_loader.data_hash
+            model, le_cat, le_month, le_season, is_trained = self._snapshot()
+            if not is_trained:
+                self.load_or_train()
+                return
+
+            try:
+                X, y = training_matrix(new_rows, le_cat, le_month, le_season)
+            except ValueError as e:
+                print(f"New labels in ingested rows ({e}); retraining from scratch.")
+                self.train_model()
+                return
+
+            updated = xgb.XGBRegressor(objective='reg:squarederror', n_estimators=rounds)
+            updated.fit(X, y, xgb_model=model.get_booster())
+
+            self._publish(updated, le_cat, le_month, le_season, version, data_hash, {
+                "rows": len(self.data_loader.get_all_data()),
+                "n_estimators": updated.get_booster().num_boosted_rounds(),
+                "warm_start_from": self.model_version,
+                "warm_start_rows": len(new_rows),
+            })
+            print(f"XGBoost model updated with {rounds} rounds on {len(new_rows)} new rows.")
+
+    def ingest(self, rows, rounds=10):
+        # Append rows to the shared dataset and warm-start the model on them, as one step
+        # so concurrent predictions never trigger a full retrain for the new data hash
+        with self._lock:
+            self.ensure_model()
+            delta = self.data_loader.ingest(rows)
+            self.update_model(delta, rounds)
+        return delta
+
+    def _publish(self, model, le_cat, le_month, le_season, data_version, data_hash, meta):
+        model_version = None
+        if self.registry is not None and data_hash is not None:
+            model_version = self.registry.save(
+                model,
+                {"le_cat": le_cat, "le_month": le_month, "le_season": le_season},
+                data_hash,
+                meta,
+            )
+
+        with self._lock:
+            self._install(model, le_cat, le_month, le_season)
+            self.model_version = model_version
+            self.data_version = data_version
+            self.data_hash = data_hash
+
     def predict(self, year, month, holidays):
         # Predict aggregate demand for the month (simplified)
         # In reality, we'd predict per product and sum up, or have a separate aggregate model.
@@ -58,6 +217,7 @@ class DemandPredictor:
         # The UI shows "Total Sold" (historical) and "Predicted Demand".
         # Let's predict the total demand for ALL products in that month.
         
+        self.ensure_model()
         if not self.is_trained:
             return 100 + (holidays * 10)
 
@@ -67,66 +227,141 @@ class DemandPredictor:
         return 500 + (holidays * 10)
 
     def predict_single_item(self, product_name, year, month, holidays=0):
-        # Find product details to build feature vector
-        loader = DataLoader()
-        df = loader.get_all_data()
-        product_row = df[df['product_name'] == product_name].iloc[0] if not df[df['product_name'] == product_name].empty else None
-        
-        if product_row is None or not self.is_trained:
-            # Fallback
-            return 150 + (holidays * 10)
+        return int(self.predict_batch([product_name], year, month, holidays)[0])
+
+    @timed("predictor.predict_batch")
+    def predict_batch(self, products, year, month, holidays=0):
+        # Predict demand for many products with one feature matrix and one model call.
+        # year, month and holidays may be scalars or per-product arrays.
+        n = len(products)
+        year = np.broadcast_to(np.asarray(year), (n,))
+        month = np.broadcast_to(np.asarray(month), (n,))
+        holidays = np.broadcast_to(np.asarray(holidays), (n,))
+
+        # Fallback for unknown products or an untrained model
+        predictions = 150 + holidays.astype(np.int64) * 10
+        if n == 0:
+            return predictions
+
+        self.ensure_model()
+        model, le_cat, le_month, le_season, is_trained = self._snapshot()
+        if not is_trained:
+            return predictions
+
+        index = self.data_loader.index
+        rows = np.array([index.first_row.get(p, -1) for p in products], dtype=np.int64)
+        known = rows >= 0
+        if not known.any():
+            return predictions
+        count("predictions_total", int(known.sum()))
 
         try:
-            # Prepare input
-            # We need to map the input month (int) to the encoder's expected string
-            month_map = {
-                1: "January", 2: "February", 3: "March", 4: "April",
-                5: "May", 6: "June", 7: "July", 8: "August",
-                9: "September", 10: "October", 11: "November", 12: "December"
-            }
-            month_str = month_map.get(month, "January")
-            
-            # Check if month_str is in encoder classes
-            if month_str not in self.le_month.classes_:
-                month_enc = 0 # Fallback
-            else:
-                month_enc = self.le_month.transform([month_str])[0]
-                
-            cat_enc = self.le_cat.transform([str(product_row['product_category'])])[0]
-            season_enc = self.le_season.transform([str(product_row['season'])])[0] # Assuming season doesn't change much or we pick one
-            
-            # Construct feature vector
-            # ['product_category_enc', 'product_price', 'month_enc', 'year', 'season_enc', 'No.of holidays in that month']
-            features = pd.DataFrame([[
-                cat_enc,
-                product_row['product_price'],
-                month_enc,
-                year,
-                season_enc,
-                holidays
-            ]], columns=['product_category_enc', 'product_price', 'month_enc', 'year', 'season_enc', 'No.of holidays in that month'])
-            
-            prediction = self.model.predict(features)[0]
-            
-            # Apply user's logic: "all the products will sell atleast 10 extra" (if holidays > 0?)
-            # The user said: "logic applies of holiday so all the products will sell atleast 10 extra is our logic."
-            # We included holidays in the model, but let's enforce the +10 rule if holidays are present.
-            if holidays > 0:
-                prediction += 10
-                
-            return int(max(0, prediction))
-            
+            df = index.df
+            product_rows = rows[known]
+            with span("predictor.encode"):
+                cat_enc, cat_ok = self._encode(le_cat, df['product_category'].to_numpy()[product_rows])
+                season_enc, season_ok = self._encode(le_season, df['season'].to_numpy()[product_rows])
+
+                # Months the encoder never saw fall back to code 0
+                month_names = np.array([MONTH_MAP.get(int(m), "January") for m in month[known]])
+                month_enc, month_ok = self._encode(le_month, month_names)
+                month_enc[~month_ok] = 0
+
+                # ['product_category_enc', 'product_price', 'month_enc', 'year', 'season_enc', 'No.of holidays in that month']
+                features = np.column_stack([
+                    cat_enc,
+                    df['product_price'].to_numpy()[product_rows],
+                    month_enc,
+                    year[known],
+                    season_enc,
+                    holidays[known],
+                ]).astype(np.float32)
+
+            with span("predictor.xgboost_predict"):
+                predicted = model.predict(features)
+
+            # Apply user's logic: "all the products will sell atleast 10 extra" if holidays are present
+            predicted = predicted + np.where(holidays[known] > 0, 10, 0)
+            predicted = np.maximum(0, predicted).astype(np.int64)
+
+            # Products whose category/season the encoder can't map get the plain fallback
+            predicted[~(cat_ok & season_ok)] = 150
+            predictions[known] = predicted
+            return predictions
+
         except Exception as e:
             print(f"Prediction error: {e}")
-            return 150
+            predictions[known] = 150
+            return predictions
+
+    @staticmethod
+    def _encode(encoder, values):
+        # Vectorized LabelEncoder.transform that flags unseen labels instead of raising
+        values = np.asarray(values).astype(str)
+        classes = encoder.classes_.astype(str)
+        codes = np.searchsorted(classes, values)
+        codes = np.minimum(codes, len(classes) - 1)
+        valid = classes[codes] == values
+        return codes, valid
+
+class Fitness:
+    """
+    Mean simulated cost per gene. With a fixed `noise` (common random numbers drawn once per
+    run) a gene's cost never changes, so each distinct gene is simulated once and memoized.
+    Without it every call draws fresh scenarios and nothing is cached.
+    """
+
+    def __init__(self, optimizer, predicted_demand, current_stock, noise=None):
+        self.optimizer = optimizer
+        self.predicted_demand = predicted_demand
+        self.current_stock = current_stock
+        self.noise = noise
+        self.memo = {}
+        # Genes actually simulated
+        self.evaluations = 0
+
+    def __call__(self, genes):
+        genes = np.asarray(genes, dtype=np.int64).reshape(-1, 3)
+        if self.noise is None:
+            self.evaluations += len(genes)
+            return self.optimizer.plan_costs(genes, self.predicted_demand, self.current_stock)
+
+        keys = [tuple(g) for g in genes.tolist()]
+        missing = [k for k in dict.fromkeys(keys) if k not in self.memo]
+        if missing:
+            costs = self.optimizer.plan_costs(np.array(missing), self.predicted_demand, self.current_stock, self.noise)
+            self.memo.update(zip(missing, costs.tolist()))
+            self.evaluations += len(missing)
+        return np.array([self.memo[k] for k in keys])
 
-import random
 
 class GeneticOptimizer:
-    def __init__(self, population_size=20, generations=10, mutation_rate=0.1):
+    def __init__(self, population_size=20, generations=10, mutation_rate=0.1, data_loader=None, seed=None, days=30,
+                 replications=1, common_random_numbers=False, search="auto", grid_limit=4096, grid_budget=5_000_000,
+                 patience=3, tolerance=1e-3):
+        # Only needed to look up stock when the caller doesn't pass it; resolved lazily so
+        # optimizers in worker processes never load the dataset
+        self.data_loader = data_loader
         self.population_size = population_size
         self.generations = generations
         self.mutation_rate = mutation_rate
+        self.days = days
+        # Fitness is the mean cost over this many simulated months
+        self.replications = max(1, int(replications))
+        # When set, every individual in a generation is scored on the same demand scenarios,
+        # so rankings reflect the policy rather than the luck of its draw
+        self.common_random_numbers = common_random_numbers
+        # Single seeded generator for demand draws and GA operators, so runs are reproducible
+        self.rng = np.random.default_rng(seed)
+        # "ga", "grid" (coarse-to-fine, exhaustive for small spaces) or "auto": grid while its first
+        # level (at most `grid_limit` genes) x replications stays within `grid_budget` simulated
+        # months, GA otherwise. The zoom levels add only a few dozen genes each.
+        self.search = search
+        self.grid_limit = grid_limit
+        self.grid_budget = grid_budget
+        # GA stops early after `patience` generations without a relative improvement of `tolerance`
+        self.patience = patience
+        self.tolerance = tolerance
         
         # Route types: (Cost, Lead Time in days)
         self.routes = [
@@ -134,79 +369,140 @@ class GeneticOptimizer:
             {"id": 1, "name": "Express Van", "cost": 150, "lead_time": 2},
             {"id": 2, "name": "Air Freight", "cost": 500, "lead_time": 1},
         ]
+        self._route_costs = np.array([r["cost"] for r in self.routes], dtype=np.float64)
+        self._route_lead_times = np.array([r["lead_time"] for r in self.routes], dtype=np.int64)
+
+    def _draw_noise(self, n):
+        # Standard-normal demand shocks shaped (individuals, replications, days). With common random
+        # numbers the individual axis has length 1 and is broadcast across the population.
+        if self.common_random_numbers:
+            return self.rng.standard_normal((1, self.replications, self.days))
+        return self.rng.standard_normal((n, self.replications, self.days))
 
     def _simulate_cost(self, gene, predicted_monthly_demand, current_stock):
-        reorder_point, safety_stock, route_idx = gene
-        route = self.routes[route_idx]
-        
+        return float(self._simulate_costs([gene], predicted_monthly_demand, current_stock)[0])
+
+    def _simulate_costs(self, population, predicted_monthly_demand, current_stock, noise=None):
+        # Mean cost per individual over the replications in `noise` (drawn if not given)
+        genes = np.asarray(population, dtype=np.int64).reshape(-1, 3)
+        if noise is None:
+            noise = self._draw_noise(len(genes))
+        count("ga_evaluations_total", len(genes) * noise.shape[1])
+        return self._simulate(genes, predicted_monthly_demand, current_stock, noise).mean(axis=1)
+
+    def plan_costs(self, genes, predicted_monthly_demand, current_stock, noise=None):
+        # Mean cost per plan (gene). Demand and stock may be given per plan. Plans are simulated in
+        # chunks of SIMULATION_CHUNK (plan, replication) months to bound memory; with common random
+        # numbers every chunk sees the same scenarios (`noise`, or one set drawn here).
+        genes = np.asarray(genes, dtype=np.int64).reshape(-1, 3)
+        n = len(genes)
+        demand = np.broadcast_to(np.asarray(predicted_monthly_demand, dtype=np.float64), (n,))
+        stock = np.broadcast_to(np.asarray(current_stock, dtype=np.float64), (n,))
+        if noise is None and self.common_random_numbers:
+            noise = self._draw_noise(1)
+        chunk_size = max(1, SIMULATION_CHUNK // self.replications)
+        costs = np.empty(n)
+        for start in range(0, n, chunk_size):
+            end = start + chunk_size
+            costs[start:end] = self._simulate_costs(genes[start:end], demand[start:end], stock[start:end], noise)
+        return costs
+
+    def _simulate(self, genes, predicted_monthly_demand, current_stock, noise):
+        # Evaluate every (individual, replication) pair at once: state is one (n x R) array per
+        # variable and days are stepped in lockstep. predicted_monthly_demand and current_stock may
+        # be scalars or per-individual arrays. Daily demand is the daily mean +/-20% gaussian noise.
+        # Each order brings in a month of predicted demand plus the gene's safety stock.
+        n = len(genes)
+        r = noise.shape[1]
+        reorder_point = genes[:, 0, None]
+        safety_stock = genes[:, 1, None]
+        ordering_cost = self._route_costs[genes[:, 2]][:, None]
+        lead_time = self._route_lead_times[genes[:, 2]][:, None]
+
         holding_cost_per_unit = 0.5
         stockout_cost_per_unit = 20.0
-        ordering_cost = route["cost"]
-        lead_time = route["lead_time"]
-        
-        daily_demand_mean = predicted_monthly_demand / 30.0
-        
-        stock = current_stock
-        total_cost = 0
-        order_pending_days = 0
-        order_incoming = False
-        orders_placed = 0
-        
-        stock_sum = 0
-        stockout_sum = 0
-        
-        # Simulate 30 days
-        for _ in range(30):
+
+        monthly_demand = np.broadcast_to(np.asarray(predicted_monthly_demand, dtype=np.float64), (n,))[:, None]
+        daily_demand_mean = monthly_demand / self.days
+        replenishment = monthly_demand + safety_stock
+
+        stock = np.broadcast_to(np.asarray(current_stock, dtype=np.float64), (n,))[:, None].repeat(r, axis=1)
+        order_pending_days = np.zeros((n, r), dtype=np.int64)
+        order_incoming = np.zeros((n, r), dtype=bool)
+        orders_placed = np.zeros((n, r), dtype=np.int64)
+
+        stock_sum = np.zeros((n, r))
+        stockout_sum = np.zeros((n, r))
+
+        for day in range(self.days):
             # Demand fluctuation
-            daily_demand = max(0, int(random.gauss(daily_demand_mean, daily_demand_mean * 0.2)))
-            
+            daily_demand = np.maximum(0, np.trunc(daily_demand_mean * (1.0 + 0.2 * noise[:, :, day])))
+
             # Fulfill demand
-            if stock >= daily_demand:
-                stock -= daily_demand
-            else:
-                stockout_sum += (daily_demand - stock)
-                stock = 0
-                
+            short = daily_demand > stock
+            stockout_sum += np.where(short, daily_demand - stock, 0)
+            stock = np.where(short, 0, stock - daily_demand)
+
             # Receive order
-            if order_incoming:
-                order_pending_days -= 1
-                if order_pending_days <= 0:
-                    stock += predicted_monthly_demand  # Simple replenishment
-                    order_incoming = False
-            
+            order_pending_days -= order_incoming
+            arrived = order_incoming & (order_pending_days <= 0)
+            stock += np.where(arrived, replenishment, 0)  # Simple replenishment
+            order_incoming &= ~arrived
+
             # Place order if needed
-            if not order_incoming and stock <= reorder_point:
-                order_incoming = True
-                order_pending_days = lead_time
-                orders_placed += 1
-                
+            place = ~order_incoming & (stock <= reorder_point)
+            order_incoming |= place
+            order_pending_days = np.where(place, lead_time, order_pending_days)
+            orders_placed += place
+
             stock_sum += stock
-            
-        avg_stock = stock_sum / 30.0
-        
+
+        avg_stock = stock_sum / self.days
+
         total_holding_cost = avg_stock * holding_cost_per_unit
         total_ordering_cost = orders_placed * ordering_cost
         total_stockout_cost = stockout_sum * stockout_cost_per_unit
-        
+
         return total_holding_cost + total_ordering_cost + total_stockout_cost
 
-    def _create_individual(self, predicted_demand):
-        # Random genes
-        rp = random.randint(0, int(predicted_demand))
-        ss = random.randint(0, int(predicted_demand * 0.5))
-        rt = random.randint(0, len(self.routes) - 1)
-        return [rp, ss, rt]
-
-    def _mutate(self, gene, predicted_demand):
-        if random.random() < self.mutation_rate:
-            gene[0] = max(0, gene[0] + random.randint(-10, 10)) # RP
-        if random.random() < self.mutation_rate:
-            gene[1] = max(0, gene[1] + random.randint(-5, 5))   # SS
-        if random.random() < self.mutation_rate:
-            gene[2] = random.randint(0, len(self.routes) - 1)   # Route
-        return gene
-
-    def optimize_supply_chain(self, product_name, predicted_demand, current_stock):
+    def _gene_bounds(self, predicted_demand):
+        # Inclusive upper bounds of [reorder point, safety stock, route index]
+        return np.array([int(predicted_demand), int(predicted_demand * 0.5), len(self.routes) - 1])
+
+    def _create_population(self, predicted_demand, size, warm_start=None):
+        # Random genes: [reorder point, safety stock, route index]
+        population = np.column_stack([
+            self.rng.integers(0, int(predicted_demand) + 1, size),
+            self.rng.integers(0, int(predicted_demand * 0.5) + 1, size),
+            self.rng.integers(0, len(self.routes), size),
+        ])
+        if warm_start is not None:
+            # Seed a quarter of the population with the previous optimum and its neighbours
+            bounds = self._gene_bounds(predicted_demand)
+            start = np.clip(np.asarray(warm_start, dtype=np.int64), 0, bounds)
+            k = max(1, size // 4)
+            neighbours = np.repeat(start[None, :], k, axis=0)
+            neighbours[1:, 0] += self.rng.integers(-10, 11, k - 1)
+            neighbours[1:, 1] += self.rng.integers(-5, 6, k - 1)
+            population[:k] = np.clip(neighbours, 0, bounds)
+        return population
+
+    def _mutate_population(self, genes):
+        n = len(genes)
+        genes = genes.copy()
+        mutate = self.rng.random((n, 3)) < self.mutation_rate
+        genes[:, 0] = np.where(mutate[:, 0], np.maximum(0, genes[:, 0] + self.rng.integers(-10, 11, n)), genes[:, 0]) # RP
+        genes[:, 1] = np.where(mutate[:, 1], np.maximum(0, genes[:, 1] + self.rng.integers(-5, 6, n)), genes[:, 1])   # SS
+        genes[:, 2] = np.where(mutate[:, 2], self.rng.integers(0, len(self.routes), n), genes[:, 2])                 # Route
+        return genes
+
+    @timed("optimizer.optimize_supply_chain")
+    def optimize_supply_chain(self, product_name, predicted_demand, current_stock=None, warm_start=None):
+        # warm_start: [reorder point, safety stock, route index] to seed the search with, e.g. the
+        # same product's optimum from the previous month
+        if current_stock is None:
+            current_stock = (self.data_loader or get_data_loader()).get_product_stock(product_name)
+
         if predicted_demand <= 0:
             return {
                 "product": product_name,
@@ -215,43 +511,137 @@ class GeneticOptimizer:
                 "optimal_route": "None",
                 "estimated_cost": 0
             }
-            
-        # Initialize population
-        population = [self._create_individual(predicted_demand) for _ in range(self.population_size)]
-        
-        for _ in range(self.generations):
-            # Evaluate fitness (Cost) - Lower is better
-            scores = [(ind, self._simulate_cost(ind, predicted_demand, current_stock)) for ind in population]
-            scores.sort(key=lambda x: x[1]) # Sort by cost ascending
-            
-            # Selection (Top 50%)
-            survivors = [s[0] for s in scores[:self.population_size // 2]]
-            
-            # Crossover & Refill
-            new_population = survivors[:]
-            while len(new_population) < self.population_size:
-                p1 = random.choice(survivors)
-                p2 = random.choice(survivors)
-                
-                # Crossover
-                child = [p1[0], p2[1], p1[2]] if random.random() > 0.5 else [p2[0], p1[1], p2[2]]
-                
-                # Mutation
-                child = self._mutate(child, predicted_demand)
-                new_population.append(child)
-                
-            population = new_population
-
-        # Best solution
-        best_gene = population[0]
-        best_cost = self._simulate_cost(best_gene, predicted_demand, current_stock)
-        
+
+        # One fixed scenario set for the whole run makes fitness deterministic, and memoizable
+        noise = self._draw_noise(1) if self.common_random_numbers else None
+        fitness = Fitness(self, predicted_demand, current_stock, noise)
+
+        bounds = self._gene_bounds(predicted_demand)
+        space = int(np.prod(bounds + 1))
+        search = self.search
+        if search == "auto":
+            grid_cost = min(space, self.grid_limit) * self.replications
+            search = "grid" if grid_cost <= self.grid_budget else "ga"
+
+        if search == "grid":
+            best_gene, best_cost = self._grid_search(fitness, bounds)
+            rounds = None
+        else:
+            best_gene, best_cost, rounds = self._genetic_search(fitness, predicted_demand, warm_start)
+
+        best_gene = [int(g) for g in best_gene]
         return {
             "product": product_name,
             "reorder_point": best_gene[0],
             "safety_stock": best_gene[1],
             "optimal_route": self.routes[best_gene[2]]["name"],
             "route_details": self.routes[best_gene[2]],
-            "estimated_cost": round(best_cost, 2)
+            "estimated_cost": round(best_cost, 2),
+            "replications": self.replications,
+            "search": search,
+            "generations": rounds,
+            "evaluations": fitness.evaluations,
+            "warm_started": warm_start is not None and search == "ga",
         }
 
+    def _genetic_search(self, fitness, predicted_demand, warm_start=None):
+        # Returns (best gene, its cost, generations run)
+        population = self._create_population(predicted_demand, self.population_size, warm_start)
+        n_survivors = max(1, self.population_size // 2)
+        if self.generations == 0:
+            return population[0], float(fitness(population[:1])[0]), 0
+
+        best_cost = np.inf
+        stale = 0
+        rounds = 0
+        for _ in range(self.generations):
+            # Evaluate fitness (mean Cost over the replications) for the whole population - Lower is better
+            costs = fitness(population)
+            ranked = np.argsort(costs, kind="stable") # Sort by cost ascending
+            rounds += 1
+
+            # Best solution, reported with the cost it was selected on rather than a fresh random draw
+            best_gene = population[ranked[0]]
+            generation_best = float(costs[ranked[0]])
+            improved = rounds == 1 or generation_best < best_cost - self.tolerance * abs(best_cost)
+            stale = 0 if improved else stale + 1
+            best_cost = min(best_cost, generation_best)
+            if stale >= self.patience:
+                break
+
+            # Selection (Top 50%)
+            survivors = population[ranked[:n_survivors]]
+
+            # Crossover & Refill
+            n_children = self.population_size - n_survivors
+            p1 = survivors[self.rng.integers(0, n_survivors, n_children)]
+            p2 = survivors[self.rng.integers(0, n_survivors, n_children)]
+            swap = self.rng.random(n_children) > 0.5
+            children = np.where(
+                swap[:, None],
+                np.column_stack([p1[:, 0], p2[:, 1], p1[:, 2]]),
+                np.column_stack([p2[:, 0], p1[:, 1], p2[:, 2]]),
+            )
+
+            # Mutation
+            population = np.vstack([survivors, self._mutate_population(children)])
+
+        return best_gene, generation_best, rounds
+
+    def _grid_search(self, fitness, bounds):
+        # Every route x a (reorder point, safety stock) grid. The grid starts with the smallest
+        # power-of-two step that keeps it within grid_limit genes (step 1 = exhaustive), then
+        # zooms in around the best point with half the step until the step is 1.
+        n_routes = int(bounds[2]) + 1
+        per_route = max(1, self.grid_limit // n_routes)
+        lo = np.zeros(2, dtype=np.int64)
+        hi = bounds[:2].copy()
+        step = 1
+        while ((hi[0] // step) + 1) * ((hi[1] // step) + 1) > per_route:
+            step *= 2
+
+        best_gene, best_cost = None, np.inf
+        while True:
+            rp, ss, route = np.meshgrid(
+                np.arange(lo[0], hi[0] + 1, step), np.arange(lo[1], hi[1] + 1, step), np.arange(n_routes),
+                indexing="ij")
+            genes = np.column_stack([rp.ravel(), ss.ravel(), route.ravel()])
+            costs = fitness(genes)
+            i = int(np.argmin(costs))
+            if costs[i] < best_cost:
+                best_gene, best_cost = genes[i], float(costs[i])
+            if step == 1:
+                return best_gene, best_cost
+            lo = np.maximum(0, best_gene[:2] - step)
+            hi = np.minimum(bounds[:2], best_gene[:2] + step)
+            step //= 2
+
+
+class OptimumStore:
+    # Best gene found per (product, year, month), used to warm-start the same product's search
+    # for the following month
+    def __init__(self):
+        self._best = {}
+        self._lock = threading.Lock()
+
+    def record(self, product, year, month, result):
+        if "route_details" not in result:
+            return
+        gene = [result["reorder_point"], result["safety_stock"], result["route_details"]["id"]]
+        with self._lock:
+            self._best[(product, int(year), int(month))] = gene
+
+    def previous(self, product, year, month):
+        year, month = (int(year), int(month) - 1) if int(month) > 1 else (int(year) - 1, 12)
+        with self._lock:
+            return self._best.get((product, year, month))
+
+
+def optimize_product(product_name, predicted_demand, current_stock, seed=None, replications=1, warm_start=None,
+                     search="auto"):
+    # Top-level entry point for process pools: one independent optimizer per product
+    optimizer = GeneticOptimizer(seed=seed, replications=replications, common_random_numbers=True, search=search)
+    result = optimizer.optimize_supply_chain(product_name, predicted_demand, current_stock, warm_start)
+    result["predicted_demand"] = predicted_demand
+    result["current_stock"] = current_stock
+    return result
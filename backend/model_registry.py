@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import shutil
+import time
+import numpy as np
+import xgboost as xgb
+from sklearn.preprocessing import LabelEncoder
+
+DEFAULT_MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+ENCODER_NAMES = ["le_cat", "le_month", "le_season"]
+
+
+class ModelRegistry:
+    """
+    Versioned demand-model artifacts on disk. Each version is a directory holding the
+    XGBoost booster, the label encoder classes and a meta.json with the hash of the
+    dataset it was trained on:
+
+        models/<version>/model.json
+        models/<version>/encoders.json
+        models/<version>/meta.json
+    """
+
+    def __init__(self, root=DEFAULT_MODEL_DIR):
+        self.root = root
+
+    def save(self, model, encoders, data_hash, extra_meta=None):
+        os.makedirs(self.root, exist_ok=True)
+        version = self._new_version(data_hash)
+        tmp_dir = os.path.join(self.root, f".{version}.tmp")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        model.save_model(os.path.join(tmp_dir, "model.json"))
+        with open(os.path.join(tmp_dir, "encoders.json"), "w") as f:
+            json.dump({name: encoders[name].classes_.tolist() for name in ENCODER_NAMES}, f)
+
+        meta = {
+            "version": version,
+            "data_hash": data_hash,
+            "created_at": time.time(),
+        }
+        meta.update(extra_meta or {})
+        with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+            json.dump(meta, f)
+
+        # Publish atomically so a concurrent load never sees a half-written artifact
+        os.replace(tmp_dir, os.path.join(self.root, version))
+        return version
+
+    def load(self, version):
+        path = os.path.join(self.root, version)
+        model = xgb.XGBRegressor()
+        model.load_model(os.path.join(path, "model.json"))
+
+        with open(os.path.join(path, "encoders.json")) as f:
+            classes = json.load(f)
+        encoders = {}
+        for name in ENCODER_NAMES:
+            le = LabelEncoder()
+            le.classes_ = np.array(classes[name], dtype=object)
+            encoders[name] = le
+
+        return model, encoders, self.get_meta(version)
+
+    def get_meta(self, version):
+        with open(os.path.join(self.root, version, "meta.json")) as f:
+            return json.load(f)
+
+    def list_versions(self, data_hash=None):
+        # Oldest first; version names sort chronologically
+        if not os.path.isdir(self.root):
+            return []
+        metas = []
+        for name in sorted(os.listdir(self.root)):
+            if name.startswith(".") or not os.path.isfile(os.path.join(self.root, name, "meta.json")):
+                continue
+            meta = self.get_meta(name)
+            if data_hash is None or meta.get("data_hash") == data_hash:
+                metas.append(meta)
+        return metas
+
+    def latest(self, data_hash=None):
+        versions = self.list_versions(data_hash)
+        return versions[-1] if versions else None
+
+    def _new_version(self, data_hash):
+        base = f"{time.strftime('%Y%m%d-%H%M%S')}-{data_hash[:12]}"
+        version, n = base, 1
+        while os.path.exists(os.path.join(self.root, version)):
+            n += 1
+            version = f"{base}-{n}"
+        return version
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train and manage demand model artifacts")
+    parser.add_argument("--models", default=DEFAULT_MODEL_DIR, help="Model registry directory")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("train", help="Train on the dataset and save a new version")
+    train.add_argument("--data", default=None, help="Path to the dataset workbook")
+    train.add_argument("--force", action="store_true", help="Retrain even if a version for this dataset exists")
+
+    sub.add_parser("list", help="List saved versions")
+    args = parser.parse_args()
+
+    registry = ModelRegistry(args.models)
+
+    if args.command == "list":
+        for meta in registry.list_versions():
+            print(f"{meta['version']}  data={meta['data_hash'][:12]}  rows={meta.get('rows')}")
+        return
+
+    # Imported here so `list` works without loading the dataset
+    from data_loader import DataLoader
+    from ml_engine import DemandPredictor
+
+    loader = DataLoader(args.data) if args.data else DataLoader()
+    existing = registry.latest(loader.data_hash)
+    if existing and not args.force:
+        print(f"Model {existing['version']} already matches this dataset (use --force to retrain)")
+        return
+
+    predictor = DemandPredictor(loader, registry=registry)
+    predictor.train_model()
+    print(f"Saved model version {predictor.model_version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """
+    Bounded in-memory cache for endpoint responses. Entries are keyed on
+    (endpoint, normalized request, dataset hash, model version), expire after
+    `ttl_seconds` and are evicted least-recently-used once `max_entries` is reached.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=300):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def make_key(endpoint, params, data_hash, model_version=None):
+        # Sorted-key JSON so logically equal requests map to the same entry
+        return (endpoint, json.dumps(params, sort_keys=True, default=str), data_hash, model_version)
+
+    def get(self, key):
+        # Returns (found, value)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        # Drop everything, e.g. after the dataset or the model was reloaded
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
@@ -0,0 +1,85 @@
+import numpy as np
+from metrics import timed
+from ml_engine import GeneticOptimizer
+
+# Largest number of simulated (plan, replication) months per request
+MAX_SIMULATED_MONTHS = 5_000_000
+
+
+@timed("scenarios.run")
+def run_scenarios(predictor, loader, products, year, months, holidays, demand_multipliers,
+                  safety_stock_ratio=0.1, replications=20, seed=None):
+    """
+    What-if sweep over every (product, month, holidays, demand multiplier) combination.
+
+    Demand for all (product, month, holidays) cells comes from one predict_batch call; the
+    multiplier scales it. Each scenario is then costed for every route with the same reorder
+    policy (reorder point = lead-time demand + safety stock, safety stock = ratio x demand),
+    all in one vectorized simulation on common demand scenarios. Results are dense NumPy arrays
+    indexed in the order of `dims`.
+    """
+    optimizer = GeneticOptimizer(seed=seed, replications=replications, common_random_numbers=True)
+    routes = optimizer.routes
+    P, M, H, D, R = len(products), len(months), len(holidays), len(demand_multipliers), len(routes)
+    plans = P * M * H * D * R
+    if plans * optimizer.replications > MAX_SIMULATED_MONTHS:
+        raise ValueError(f"Scenario grid too large: {plans} plans x {optimizer.replications} replications "
+                         f"(max {MAX_SIMULATED_MONTHS} simulated months)")
+
+    # (P, M, H) predictions in one batch
+    p_idx, m_idx, h_idx = np.meshgrid(np.arange(P), np.arange(M), np.arange(H), indexing="ij")
+    product_array = np.asarray(products, dtype=object)
+    predicted = predictor.predict_batch(
+        product_array[p_idx.ravel()].tolist(),
+        year,
+        np.asarray(months)[m_idx.ravel()],
+        np.asarray(holidays)[h_idx.ravel()],
+    ).reshape(P, M, H)
+
+    stock = np.column_stack([loader.get_stock_levels(products, year, month) for month in months]).reshape(P, M)
+
+    # (P, M, H, D)
+    multipliers = np.asarray(demand_multipliers, dtype=np.float64)
+    demand = np.round(predicted[..., None] * multipliers).astype(np.int64)
+    reorder_amount = np.maximum(0, np.trunc(demand - stock[:, :, None, None] / 2)).astype(np.int64)
+
+    # (P, M, H, D, R) plans, one per route
+    lead_times = np.array([r["lead_time"] for r in routes], dtype=np.float64)
+    safety_stock = np.round(demand * safety_stock_ratio).astype(np.int64)
+    reorder_point = np.ceil(demand[..., None] / optimizer.days * lead_times).astype(np.int64) + safety_stock[..., None]
+    shape = (P, M, H, D, R)
+    genes = np.column_stack([
+        reorder_point.ravel(),
+        np.broadcast_to(safety_stock[..., None], shape).ravel(),
+        np.broadcast_to(np.arange(R), shape).ravel(),
+    ])
+    demand_rows = np.broadcast_to(demand[..., None], shape).ravel()
+    stock_rows = np.broadcast_to(stock[:, :, None, None, None], shape).ravel()
+    cost = optimizer.plan_costs(genes, demand_rows, stock_rows).reshape(shape)
+
+    best_route = np.argmin(cost, axis=-1)
+    best_cost = np.take_along_axis(cost, best_route[..., None], axis=-1)[..., 0]
+
+    return {
+        "dims": {
+            "product": list(products),
+            "month": list(months),
+            "holidays": list(holidays),
+            "demand_multiplier": multipliers.tolist(),
+            "route": [r["name"] for r in routes],
+        },
+        "values": {
+            "predicted_demand": {"dims": ["product", "month", "holidays"], "data": predicted},
+            "stock": {"dims": ["product", "month"], "data": stock},
+            "demand": {"dims": ["product", "month", "holidays", "demand_multiplier"], "data": demand},
+            "reorder_amount": {"dims": ["product", "month", "holidays", "demand_multiplier"],
+                               "data": reorder_amount},
+            "cost": {"dims": ["product", "month", "holidays", "demand_multiplier", "route"],
+                     "data": np.round(cost, 2)},
+            "best_route": {"dims": ["product", "month", "holidays", "demand_multiplier"], "data": best_route},
+            # Catalog-wide cost of each scenario with every product on its cheapest route
+            "total_cost": {"dims": ["month", "holidays", "demand_multiplier"],
+                           "data": np.round(best_cost.sum(axis=0), 2)},
+        },
+        "replications": optimizer.replications,
+    }
@@ -0,0 +1,35 @@
+import numpy as np
+import orjson
+
+# Numeric NumPy arrays and scalars are encoded natively; dict keys may be ints/tuples (e.g. cube keys)
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(content):
+    # JSON bytes for API responses and NDJSON lines
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+def _default(obj):
+    # What orjson doesn't handle itself: object/string arrays, non-contiguous views, pandas values
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def to_columns(rows, fields=None):
+    # [{field: value}] -> {field: [values]}
+    if fields is None:
+        fields = list(rows[0]) if rows else []
+    return {f: [row[f] for row in rows] for f in fields}
+
+
+def to_rows(columns):
+    # {field: values} -> [{field: value}]; arrays become Python scalars
+    fields = list(columns)
+    values = [col.tolist() if isinstance(col, np.ndarray) else list(col) for col in columns.values()]
+    return [dict(zip(fields, row)) for row in zip(*values)]
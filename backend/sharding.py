@@ -0,0 +1,173 @@
+"""
+Demand analysis sharded by (store, category).
+
+The coordinator (API process) plans one shard per store and category, fans them out to the
+analysis process pool and merges the partial product columns and per-store totals. Each worker
+process keeps its own DataLoader and DemandPredictor and syncs them to the coordinator's
+dataset hash and model version before computing, the same way a separate node would.
+"""
+import itertools
+import numpy as np
+from data_loader import STORE_COL, get_data_loader
+from metrics import span
+from ml_engine import DemandPredictor
+from model_registry import ModelRegistry
+
+# Below this many (store, product) pairs the fan-out costs more than it saves
+DEFAULT_MIN_SHARDED_PRODUCTS = 500
+
+_worker = None
+
+
+def analyze_columns(predictor, loader, catalog, year, month, holidays, store=None):
+    # catalog: list of (category, product). Demand comes from the shared model, stock and price
+    # from `loader` (one store's view when sharding). Returns one column per field, numeric ones
+    # as arrays, so shards pickle and merge cheaply and the columnar layout needs no reshaping.
+    products = [prod for _, prod in catalog]
+    predicted = np.asarray(predictor.predict_batch(products, year, month, holidays)).astype(np.int64)
+    with span("sharding.stock_and_price"):
+        stock = loader.get_stock_levels(products, year, month)
+        prices = loader.get_prices(products).tolist()
+
+    columns = {
+        "category": [cat for cat, _ in catalog],
+        "product": products,
+        "stock": stock,
+        "predicted_demand": predicted,
+        "reorder_amount": np.maximum(0, np.trunc(predicted - stock / 2)).astype(np.int64),
+        # Python's round, not np.round, which can differ in the last digit
+        "price": np.array([round(price, 2) for price in prices], dtype=np.float64),
+        "cost": np.array([round(price * 0.7, 2) for price in prices], dtype=np.float64),  # Assumption: 30% margin
+    }
+    if store is not None:
+        columns["store"] = [store] * len(products)
+    return columns
+
+
+def shard_results(loader, predictor, store, categories, year, month, holidays):
+    # One result per (store, category) shard, with a single prediction batch for all of them
+    view = loader.for_store(store) if store is not None else loader
+    catalog = [(cat, prod) for cat in categories for prod in view.get_products_by_category(cat)]
+    columns = analyze_columns(predictor, view, catalog, year, month, holidays, store)
+    results = []
+    start = 0
+    for cat in categories:
+        end = start + len(view.get_products_by_category(cat))
+        results.append({"store": store, "category": cat, "columns": {k: v[start:end] for k, v in columns.items()}})
+        start = end
+    return results
+
+
+def analyze_shard(store, category, year, month, holidays, data_hash, model_version):
+    # Worker process entry point
+    loader, predictor = _worker_state(data_hash, model_version)
+    return shard_results(loader, predictor, store, [category], year, month, holidays)[0]
+
+
+def _worker_state(data_hash, model_version):
+    global _worker
+    if _worker is None:
+        loader = get_data_loader()
+        _worker = (loader, DemandPredictor(loader, registry=ModelRegistry()))
+    loader, predictor = _worker
+
+    if loader.data_hash != data_hash:
+        # Picks up ingested deltas the coordinator has persisted since this worker loaded
+        loader.reload()
+        if loader.data_hash != data_hash:
+            raise RuntimeError("Worker dataset is out of sync with the coordinator")
+    if model_version is not None and predictor.model_version != model_version:
+        predictor.load_version(model_version)
+    else:
+        predictor.ensure_model()
+    return loader, predictor
+
+
+def merge_shards(results):
+    # Shard columns are concatenated in plan order; per-store totals are summed across categories
+    columns = {}
+    stores = {}
+    for result in results:
+        for field, values in result["columns"].items():
+            columns.setdefault(field, []).append(values)
+        if result["store"] is None:
+            continue
+        shard = result["columns"]
+        totals = stores.setdefault(result["store"], {
+            "products": 0, "stock": 0, "predicted_demand": 0, "reorder_amount": 0, "reorder_cost": 0.0})
+        totals["products"] += len(shard["product"])
+        for field in ("stock", "predicted_demand", "reorder_amount"):
+            totals[field] += int(shard[field].sum())
+        totals["reorder_cost"] += float((shard["reorder_amount"] * shard["cost"]).sum())
+    merged = {"columns": {
+        field: np.concatenate(parts) if isinstance(parts[0], np.ndarray) else [v for part in parts for v in part]
+        for field, parts in columns.items()
+    }}
+    if stores:
+        for totals in stores.values():
+            totals["reorder_cost"] = round(totals["reorder_cost"], 2)
+        merged["stores"] = stores
+    return merged
+
+
+class ShardCoordinator:
+    def __init__(self, loader, predictor, workers, local, min_products=DEFAULT_MIN_SHARDED_PRODUCTS):
+        # workers: BoundedExecutor for shards, local: executor for small or failed shards
+        self.loader = loader
+        self.predictor = predictor
+        self.workers = workers
+        self.local = local
+        self.min_products = min_products
+
+    def plan(self, stores=None):
+        # [(store, category)], with store None when the data has no store column.
+        # Returns the shards and the number of (store, product) pairs they cover.
+        loader = self.loader
+        if STORE_COL not in loader.df.columns:
+            stores = [None]
+        elif stores is None:
+            stores = loader.get_stores()
+
+        shards = []
+        products = 0
+        for store in stores:
+            view = loader.for_store(store) if store is not None else loader
+            for cat in view.get_categories():
+                shards.append((store, cat))
+                products += len(view.get_products_by_category(cat))
+        return shards, products
+
+    async def analyze(self, year, month, holidays, stores=None):
+        shards, products = self.plan(stores)
+        if len(shards) < 2 or products < self.min_products:
+            results = await self.local.run(self._analyze_local, shards, year, month, holidays)
+            return merge_shards(results)
+
+        data_hash, model_version = self.loader.data_hash, self.predictor.model_version
+        results = await self.workers.map(
+            analyze_shard, [(store, cat, year, month, holidays, data_hash, model_version) for store, cat in shards])
+        for i, result in enumerate(results):
+            if isinstance(result, Exception):
+                # A failed node doesn't fail the request: recompute its shard here
+                print(f"Shard {shards[i]} failed ({result}); computing locally")
+                results[i] = (await self.local.run(self._analyze_local, [shards[i]], year, month, holidays))[0]
+        return merge_shards(results)
+
+    async def stream(self, year, month, holidays, stores=None):
+        # Same plan as analyze, but shard by shard on the local executor so each result can be
+        # sent as soon as it is ready
+        shards, _ = self.plan(stores)
+        for shard in shards:
+            yield (await self.local.run(self._analyze_local, [shard], year, month, holidays))[0]
+
+    def _analyze_local(self, shards, year, month, holidays):
+        # Shards are planned store by store, so each store is one prediction batch
+        results = []
+        for store, group in itertools.groupby(shards, key=lambda shard: shard[0]):
+            categories = [cat for _, cat in group]
+            results += shard_results(self.loader, self.predictor, store, categories, year, month, holidays)
+        return results
+
+    def unknown_stores(self, stores):
+        known = set(self.loader.get_stores())
+        return [store for store in stores or [] if store not in known]
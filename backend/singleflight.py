@@ -0,0 +1,108 @@
+import asyncio
+import metrics
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent identical calls: the first caller for a key starts the work and
+    later callers with the same key await that same computation instead of starting their
+    own. The work runs as its own task, so a leader that disconnects doesn't cancel it for
+    everyone else.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        # key -> Broadcast of a streamed computation
+        self._streams = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def do(self, key, fn, label=None):
+        # fn: zero-argument callable returning an awaitable
+        self.calls += 1
+        metrics.registry.incr("singleflight_calls_total", endpoint=label)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finished(key, t))
+        else:
+            self.coalesced += 1
+            metrics.registry.incr("singleflight_coalesced_total", endpoint=label)
+        return await asyncio.shield(task)
+
+    def stream(self, key, producer, label=None):
+        # do() for streamed results: producer() is an async generator started once per key as its
+        # own task, and every caller, including late ones, reads all of its items from the start
+        self.calls += 1
+        metrics.registry.incr("singleflight_calls_total", endpoint=label)
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            broadcast = Broadcast()
+            self._streams[key] = broadcast
+            task = asyncio.ensure_future(broadcast.run(producer()))
+            task.add_done_callback(lambda t: self._stream_finished(key, broadcast))
+        else:
+            self.coalesced += 1
+            metrics.registry.incr("singleflight_coalesced_total", endpoint=label)
+        return broadcast.read()
+
+    def _stream_finished(self, key, broadcast):
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    def _finished(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the exception retrieved in case every waiter has gone away
+            task.exception()
+
+    def stats(self):
+        return {
+            "in_flight": len(self._inflight) + len(self._streams),
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "dedup_ratio": round(self.coalesced / self.calls, 4) if self.calls else 0.0,
+        }
+
+
+class Broadcast:
+    # Items from one async generator, buffered so any number of readers can replay them
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self._changed = asyncio.Event()
+
+    async def run(self, items):
+        try:
+            async for item in items:
+                self.items.append(item)
+                self._wake()
+        except Exception as e:
+            # Handed to every reader once it has read the items before it
+            self.error = e
+        finally:
+            self.done = True
+            self._wake()
+
+    async def read(self):
+        i = 0
+        while True:
+            while i < len(self.items):
+                yield self.items[i]
+                i += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            await self._changed.wait()
+
+    def _wake(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+metrics.registry.describe("singleflight_calls_total", "Cache misses that went through request coalescing")
+metrics.registry.describe("singleflight_coalesced_total", "Calls that shared an identical in-flight computation")
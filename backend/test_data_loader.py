@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+import pytest
+from data_loader import DEFAULT_DATA_PATH, DataLoader, DatasetIndex
+
+
+def test_ingest_extends_index_like_full_rebuild():
+    # Two stores, so a product has several rows per (year, month)
+    df = DataLoader._read_workbook(DEFAULT_DATA_PATH)
+    df = pd.concat([df.assign(store_id='A'), df.assign(store_id='B')], ignore_index=True)
+    december = ((df['year'] == 2025) & (df['month'].astype(str) == 'December')).to_numpy()
+    december_rows = df[december]
+
+    # Delta: half of an existing period, a new period, and a product the base has never seen
+    kept, existing_period = december_rows.iloc[::2], december_rows.iloc[1::2]
+    new_period = december_rows.assign(year=2026, month='January')
+    new_product = december_rows.iloc[:1].assign(product_name='Test Product', product_id='TP-1')
+    base = pd.concat([df[~december], kept], ignore_index=True)
+    delta = pd.concat([existing_period, new_period, new_product], ignore_index=True)
+
+    loader = DataLoader(df=base)
+    loader.ingest(delta, persist=False)
+    extended, full = loader.index, DatasetIndex(loader.df)
+
+    assert set(extended.product_rows) == set(full.product_rows)
+    for name, rows in full.product_rows.items():
+        assert np.array_equal(extended.product_rows[name], rows), name
+    for attr in ('period_rows', 'period_product_rows'):
+        a, b = getattr(extended, attr), getattr(full, attr)
+        assert set(a) == set(b), attr
+        for key in b:
+            assert np.array_equal(np.sort(a[key]), np.sort(b[key])), (attr, key)
+    assert extended.latest_stock == full.latest_stock
+    assert extended.first_row == full.first_row
+    assert extended.total_stock == full.total_stock
+    assert extended.categories == full.categories
+    assert extended.products_by_category == full.products_by_category
+    assert extended.mean_price == pytest.approx(full.mean_price)
+
+    for attr in ('cells', 'period', 'period_category'):
+        a, b = getattr(extended.cube, attr), getattr(full.cube, attr)
+        assert set(a) == set(b), attr
+        for key in b:
+            assert a[key] == pytest.approx(b[key]), (attr, key)
+    assert extended.cube.period_products == full.cube.period_products
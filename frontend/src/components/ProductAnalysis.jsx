@@ -1,5 +1,4 @@
 import React, { useState, useEffect } from 'react';
-import axios from 'axios';
 import { Bar, Line, Pie } from 'react-chartjs-2';
 import {
   Chart as ChartJS,
@@ -44,12 +43,45 @@ const ProductAnalysis = () => {
         setLoading(true);
         setError('');
         try {
-            const response = await axios.post('http://localhost:8001/analysis/demand', { 
-                year, 
-                month, 
-                holidays 
+            // Streamed NDJSON: sales data first, then one chunk of rows per category,
+            // so the table fills in progressively instead of waiting for the whole catalog
+            const response = await fetch('http://localhost:8001/analysis/demand?stream=true', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ year, month, holidays })
             });
-            setData(response.data);
+            if (!response.ok) {
+                throw new Error(`Request failed with status ${response.status}`);
+            }
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let result = { sales_data: null, product_analysis: [], monthly_trends: [] };
+
+            while (true) {
+                const { done, value } = await reader.read();
+                if (done) break;
+
+                buffer += decoder.decode(value, { stream: true });
+                const lines = buffer.split('\n');
+                buffer = lines.pop();
+
+                lines.filter(line => line.trim()).forEach(line => {
+                    const message = JSON.parse(line);
+                    if (message.type === 'sales_data') {
+                        result = { ...result, sales_data: message.data };
+                    } else if (message.type === 'products') {
+                        result = { ...result, product_analysis: [...result.product_analysis, ...message.rows] };
+                    } else if (message.type === 'monthly_trends') {
+                        result = { ...result, monthly_trends: message.data };
+                    } else if (message.type === 'error') {
+                        // The server stopped mid-stream (e.g. overloaded); the table is incomplete
+                        setError(`Analysis incomplete: ${message.detail}. Please try again.`);
+                    }
+                });
+                setData(result);
+            }
         } catch (err) {
             console.error('Error fetching analysis:', err);
             setError('Failed to fetch analysis data. Please try again.');